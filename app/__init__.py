@@ -3,17 +3,40 @@ from dotenv import load_dotenv
 from flask import Flask
 from flask import redirect, url_for, render_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask import request
 from config import Config
+from app.events import ActiveParticipantHub
+from app.tasks import TaskQueue
+from app.assets import StaticAssets, mark_immutable
+from app.fragments import FragmentCache
+from app.timing import RequestTiming
 
 db = SQLAlchemy()
 migrate = Migrate()
 login = LoginManager()
 login.login_view = 'main.login'  # Hier 'main.login' statt 'login'
 csrf = CSRFProtect()
+active_hub = ActiveParticipantHub()
+tasks = TaskQueue()
+static_assets = StaticAssets()
+fragment_cache = FragmentCache()
+request_timing = RequestTiming()
+
+def _apply_sqlite_pragmas(engine, pragmas):
+    """Run the configured PRAGMAs on every new SQLite connection."""
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
 
 def create_app(config_class=Config):
     # Load .env for local development; does not override existing env by default
@@ -35,17 +58,26 @@ def create_app(config_class=Config):
             os.makedirs(db_dir, exist_ok=True)
 
     db.init_app(app)
+    if uri.startswith('sqlite') and app.config.get('SQLITE_PRAGMAS'):
+        with app.app_context():
+            _apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
     migrate.init_app(app, db)
     login.init_app(app)
     csrf.init_app(app)
+    active_hub.init_app(app)
+    tasks.init_app(app)
+    static_assets.init_app(app)
+    fragment_cache.init_app(app)
+    request_timing.init_app(app)
     # Ensure upload folder exists
     try:
         os.makedirs(app.config.get('UPLOAD_FOLDER', ''), exist_ok=True)
     except Exception:
         pass
 
-    from app import routes, models
+    from app import routes, models, cli, images
     app.register_blueprint(routes.bp)
+    cli.register(app)
 
     @app.context_processor
     def inject_site_name():
@@ -58,6 +90,22 @@ def create_app(config_class=Config):
             theme = None
         return {"theme": theme}
 
+    @app.context_processor
+    def inject_photo_helpers():
+        return {"photo_url": images.photo_url, "photo_srcset": images.photo_srcset}
+
+    @app.after_request
+    def cache_content_addressed_photos(response):
+        # Hash-named uploads are immutable; other static files keep Flask's defaults
+        if (request.endpoint == 'static' and response.status_code == 200
+                and images.is_content_addressed(request.view_args.get('filename', ''))):
+            mark_immutable(response, app.config['PHOTO_CACHE_MAX_AGE'])
+        return response
+
+    @app.context_processor
+    def inject_competition():
+        return {"current_competition": models.Competition.current}
+
     @app.context_processor
     def inject_flags():
         return {"allow_registration": app.config.get("ALLOW_REGISTRATION", False)}
@@ -0,0 +1,64 @@
+"""Point-in-time copies of the SQLite database ("archive before reset").
+
+Copies are made with SQLite's online backup API on a separate connection.
+In WAL mode that is an ordinary read transaction, so readers and writers
+carry on while the copy is written; the archive is a consistent snapshot
+of all competitions as of its start.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+from flask import current_app
+
+from app import db
+
+
+class ArchiveError(Exception):
+    """The database cannot be archived (not SQLite, folder not writable)."""
+
+
+def archive_folder():
+    """``ARCHIVE_FOLDER``, by default ``archive/`` next to the database file."""
+    folder = current_app.config.get('ARCHIVE_FOLDER')
+    if not folder:
+        database = db.engine.url.database
+        if not database or database == ':memory:':
+            raise ArchiveError('ARCHIVE_FOLDER ist nicht gesetzt.')
+        folder = os.path.join(os.path.dirname(os.path.abspath(database)), 'archive')
+    return folder
+
+
+def archive_database(label):
+    """Write a snapshot to ``<archive folder>/<label>-<timestamp>.db``; returns its path."""
+    if db.engine.dialect.name != 'sqlite':
+        raise ArchiveError('Archivieren ist nur mit SQLite möglich.')
+    folder = archive_folder()
+    try:
+        os.makedirs(folder, exist_ok=True)
+    except OSError as exc:
+        raise ArchiveError(f'Archivordner nicht verfügbar: {exc}') from exc
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(folder, f'{label}-{stamp}.db')
+    counter = 1
+    while os.path.exists(path):
+        counter += 1
+        path = os.path.join(folder, f'{label}-{stamp}-{counter}.db')
+
+    source = db.engine.raw_connection()
+    try:
+        target = sqlite3.connect(path)
+        try:
+            # One step: a single read transaction, so the copy never restarts
+            source.driver_connection.backup(target)
+        finally:
+            target.close()
+    except sqlite3.Error as exc:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise ArchiveError(f'Archivieren fehlgeschlagen: {exc}') from exc
+    finally:
+        source.close()
+    return path
@@ -0,0 +1,148 @@
+"""Fingerprinted static assets (vendored CSS/JS/fonts and our own styles).
+
+``flask assets build`` copies every file below ``app/static`` (except
+uploads) to ``static/dist`` under a content-hashed name and writes a
+manifest mapping the original path to the hashed one. Templates call
+``asset_url('static', filename=...)``, which takes the same arguments as
+``url_for`` and returns the fingerprinted URL when a manifest exists, so a
+changed file always gets a new URL and can be cached forever. Without a
+build (local development) the plain static URL is used.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, url_for
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+# Never fingerprinted: participant photos and the build output itself
+_SKIP_DIRS = {'uploads', DIST_DIR}
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def mark_immutable(response, max_age):
+    """Let browsers and proxies keep ``response`` without revalidating."""
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
+
+def _hashed_name(path, content):
+    base, ext = posixpath.splitext(path)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f'{base}.{digest}{ext}'
+
+
+def _rewrite_css_urls(path, content, manifest):
+    """Point ``url()`` references of a stylesheet at the fingerprinted files."""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        resolved = posixpath.normpath(posixpath.join(directory, target))
+        hashed = manifest.get(resolved)
+        if hashed is None:
+            return match.group(0)
+        # The stylesheet itself is written below dist/ as well
+        relative = posixpath.relpath(hashed, posixpath.join(DIST_DIR, directory))
+        return f'url({quote}{relative}{suffix}{quote})'
+
+    return _CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def build_manifest(static_folder):
+    """Write fingerprinted copies to ``static/dist`` and return the manifest.
+
+    Stylesheets are processed last so their ``url()`` references (fonts,
+    images) can be rewritten to the hashed names first.
+    """
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [name for name in dirs if name not in _SKIP_DIRS]
+        for filename in files:
+            relative = os.path.relpath(os.path.join(root, filename), static_folder)
+            sources.append(relative.replace(os.sep, '/'))
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as source:
+            content = source.read()
+        if path.endswith('.css'):
+            content = _rewrite_css_urls(path, content, manifest)
+        hashed = _hashed_name(path, content)
+        target = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as output:
+            output.write(content)
+        manifest[path] = f'{DIST_DIR}/{hashed}'
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    def __init__(self, app=None):
+        self._app = None
+        self._manifest = None
+        self._mtime = None
+        self._fingerprinted = frozenset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            'ASSET_MANIFEST', os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+        )
+        app.config.setdefault('ASSET_CACHE_MAX_AGE', 365 * 24 * 3600)
+        self._app = app
+        app.extensions['assets'] = self
+        app.add_template_global(self.url_for, 'asset_url')
+        app.after_request(self._cache_headers)
+
+    def manifest(self):
+        """Original path -> fingerprinted path; empty if assets were not built."""
+        path = self._app.config['ASSET_MANIFEST']
+        if self._manifest is not None and not self._app.debug:
+            return self._manifest
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if self._manifest is None or mtime != self._mtime:
+            manifest = {}
+            if mtime is not None:
+                with open(path, encoding='utf-8') as source:
+                    manifest = json.load(source)
+            self._manifest, self._mtime = manifest, mtime
+            self._fingerprinted = frozenset(manifest.values())
+        return self._manifest
+
+    def is_fingerprinted(self, filename):
+        self.manifest()
+        return filename in self._fingerprinted
+
+    def url_for(self, endpoint, **values):
+        """Drop-in for ``url_for`` that serves static files by their hashed name."""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest().get(values['filename'], values['filename'])
+        return url_for(endpoint, **values)
+
+    def _cache_headers(self, response):
+        if (request.endpoint == 'static' and response.status_code == 200
+                and self.is_fingerprinted(request.view_args.get('filename', ''))):
+            mark_immutable(response, self._app.config['ASSET_CACHE_MAX_AGE'])
+        return response
@@ -0,0 +1,164 @@
+"""HTTP caching helpers for the public read endpoints."""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app.models import DataVersion, current_competition_id
+
+
+def data_version_etag(version):
+    """Strong ETag for the current request at the given data version.
+
+    Versions are counted per competition, so the competition is part of the
+    tag; besides that the rendered output depends on the URL and the theme
+    cookie.
+    """
+    variant = f"{request.full_path}|{request.cookies.get('theme', '')}"
+    digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]
+    return f"{current_competition_id()}.{version}-{digest}"
+
+
+def conditional_on_data_version(anonymous_only=True):
+    """Answer ``If-None-Match`` with 304 while the data version is unchanged.
+
+    Pages rendered for logged-in users embed CSRF tokens, so by default only
+    anonymous requests are eligible. Responses carrying flash messages are
+    never tagged because they are one-off, and neither are non-200 responses.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if anonymous_only and current_user.is_authenticated:
+                return view(*args, **kwargs)
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            etag = data_version_etag(DataVersion.current())
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+class _Flight:
+    """One in-progress computation that other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class MicroCache:
+    """Short-lived per-process response cache with single-flight.
+
+    While an entry is being computed, concurrent requests for the same key
+    wait for that result instead of running the same queries again. Entries
+    expire after the TTL; callers put the data version into the key, so a
+    write (in any worker) makes the old entries unreachable immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = {}
+
+    def get_or_compute(self, key, ttl, compute, max_entries, wait_timeout=10.0):
+        """Return ``compute()`` for ``key``, sharing it for ``ttl`` seconds.
+
+        ``compute`` returns ``(value, cacheable)``; values that are not
+        cacheable are returned to their caller only, and waiting threads then
+        compute their own.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(wait_timeout) and flight.result is not None:
+                return flight.result
+            return compute()[0]
+
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                flight.result = value
+                with self._lock:
+                    if len(self._entries) >= max_entries:
+                        self._prune(time.monotonic(), max_entries)
+                    self._entries[key] = (time.monotonic() + ttl, value)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _prune(self, now, max_entries):
+        # Drop expired entries first, then the ones closest to expiry
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        overflow = len(self._entries) - max_entries + 1
+        if overflow > 0:
+            for key in sorted(self._entries, key=lambda k: self._entries[k][0])[:overflow]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_micro_cache = MicroCache()
+
+
+def micro_cached(anonymous_only=True):
+    """Serve identical concurrent requests from one rendering.
+
+    Under a spectator burst only one thread per process runs the view for a
+    given URL/theme/data version; the others reuse its response body for up
+    to ``MICROCACHE_TTL`` seconds. Like ``conditional_on_data_version`` it
+    skips logged-in users by default and requests with pending flashes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            ttl = current_app.config.get('MICROCACHE_TTL', 0)
+            if ttl <= 0 or session.get('_flashes'):
+                return view(*args, **kwargs)
+            if anonymous_only and current_user.is_authenticated:
+                return view(*args, **kwargs)
+
+            def compute():
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response, False
+                headers = [(name, value) for name, value in response.headers
+                           if name.lower() not in ('set-cookie', 'content-length')]
+                return (response.get_data(), headers), True
+
+            key = (request.endpoint, request.full_path, request.cookies.get('theme', ''),
+                   current_competition_id(), DataVersion.current())
+            result = _micro_cache.get_or_compute(
+                key, ttl, compute, current_app.config.get('MICROCACHE_MAX_ENTRIES', 256)
+            )
+            if not isinstance(result, tuple):
+                return result
+            body, headers = result
+            return current_app.response_class(body, status=200, headers=headers)
+        return wrapper
+    return decorator
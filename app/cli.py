@@ -0,0 +1,235 @@
+"""``flask`` CLI commands (registered in ``create_app``)."""
+import os
+
+import click
+from flask import current_app, g
+from flask.cli import AppGroup
+
+from app import archive, assets, db, exports, images, imports, journal
+from app.models import Competition, DataVersion, JournalCursor, Participant, ResultEvent, SiteSettings
+
+
+
+def _use_competition(ctx, _param, slug):
+    """``--competition`` callback: scope the command to the competition ``slug``."""
+    if slug is not None:
+        cid = Competition.id_for_slug(slug)
+        if cid is None:
+            raise click.BadParameter(f'unknown competition {slug!r}', ctx=ctx)
+        g.competition_id = cid
+    return slug
+
+
+competition_option = click.option(
+    '--competition', metavar='SLUG', expose_value=False, callback=_use_competition,
+    help='Competition to work on (default: DEFAULT_COMPETITION or the oldest).',
+)
+
+photos_cli = AppGroup('photos', help='Manage participant photos.')
+
+
+@photos_cli.command('variants')
+@click.option('--force', is_flag=True, help='Regenerate variants that already exist.')
+def generate_photo_variants(force):
+    """Generate thumbnail/stage variants for photos already in static/uploads."""
+    upload_dir = current_app.config['UPLOAD_FOLDER']
+    static_folder = current_app.static_folder
+    created = skipped = failed = 0
+    for filename in sorted(os.listdir(upload_dir)):
+        if images.is_variant(filename) or not os.path.isfile(os.path.join(upload_dir, filename)):
+            continue
+        photo = os.path.relpath(os.path.join(upload_dir, filename), static_folder).replace('\\', '/')
+        existing = [
+            os.path.exists(os.path.join(static_folder, images.variant_path(photo, variant)))
+            for variant in current_app.config['PHOTO_SIZES']
+        ]
+        if all(existing) and not force:
+            skipped += 1
+            continue
+        try:
+            images.generate_variants(photo, force=force)
+            created += 1
+        except Exception as exc:
+            failed += 1
+            click.echo(f'{filename}: {exc}', err=True)
+    click.echo(f'{created} processed, {skipped} skipped, {failed} failed')
+
+
+@photos_cli.command('cleanup')
+@click.option('--min-age', default=600, show_default=True, help='Keep files younger than this (seconds).')
+def cleanup_photos(min_age):
+    """Delete uploads that no participant references."""
+    removed = images.cleanup_orphan_photos(min_age=min_age)
+    for photo in removed:
+        click.echo(f'removed {photo}')
+    click.echo(f'{len(removed)} orphaned files removed')
+
+
+@photos_cli.command('rehash')
+def rehash_photos():
+    """Move photos uploaded before content addressing to hash-named files."""
+    moved = missing = 0
+    old_photos, new_photos = set(), set()
+    for participant in Participant.query.filter(Participant.photo.isnot(None)):
+        if images.is_content_addressed(participant.photo):
+            continue
+        if not os.path.isfile(os.path.join(current_app.static_folder, participant.photo)):
+            missing += 1
+            click.echo(f'{participant.photo}: file not found', err=True)
+            continue
+        old_photos.add(participant.photo)
+        participant.photo = images.rehash_photo(participant.photo)
+        new_photos.add(participant.photo)
+        moved += 1
+    if moved:
+        DataVersion.bump()
+        db.session.commit()
+        for photo in new_photos:
+            images.generate_variants(photo)
+        for photo in old_photos:
+            images.release_photo(photo)
+    click.echo(f'{moved} moved, {missing} missing')
+
+
+assets_cli = AppGroup('assets', help='Build fingerprinted static assets.')
+
+
+@assets_cli.command('build')
+def build_assets():
+    """Copy static files to static/dist under content-hashed names."""
+    manifest = assets.build_manifest(current_app.static_folder)
+    click.echo(f'{len(manifest)} assets written to {current_app.config["ASSET_MANIFEST"]}')
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(sorted(exports.EXPORTS)))
+@click.argument('output', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(sorted(exports.FORMATS)),
+              help='Defaults to the extension of OUTPUT, else csv.')
+@click.option('--all-rounds', is_flag=True, help='Include prelim rounds even if they are hidden.')
+@competition_option
+def export_command(kind, output, fmt, all_rounds):
+    """Write the ranking or the participant list to OUTPUT ('-' for stdout)."""
+    if fmt is None:
+        extension = os.path.splitext(output)[1].lstrip('.').lower()
+        fmt = extension if extension in exports.FORMATS else 'csv'
+    hide_prelim_rounds = False if all_rounds else bool(SiteSettings.get_settings().hide_prelim_rounds)
+    with click.open_file(output, 'wb') as target:
+        for chunk in exports.iter_export(kind, fmt, hide_prelim_rounds):
+            target.write(chunk)
+    if output != '-':
+        click.echo(f'{kind} exported to {output}', err=True)
+
+
+@click.command('archive')
+@click.option('--label', default='archiv', show_default=True, help='File name prefix.')
+def archive_command(label):
+    """Snapshot the database into ARCHIVE_FOLDER (online, readers keep running)."""
+    try:
+        path = archive.archive_database(label)
+    except archive.ArchiveError as exc:
+        raise click.ClickException(str(exc))
+    click.echo(f'archived to {path}')
+
+
+participants_cli = AppGroup('participants', help='Manage participants.')
+
+
+@participants_cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--dry-run', is_flag=True, help='Validate only; nothing is saved.')
+@click.option('--skip-invalid', is_flag=True, help='Import the valid rows even if others have errors.')
+@competition_option
+def import_participants_command(source, dry_run, skip_invalid):
+    """Import participants from a CSV registration list ('-' for stdin)."""
+    settings = SiteSettings.get_settings()
+    try:
+        report = imports.import_participants(
+            source, dry_run=dry_run, skip_invalid=skip_invalid,
+            qualified=bool(settings.hide_prelim_rounds),
+        )
+    except imports.ImportFileError as exc:
+        db.session.rollback()
+        raise click.ClickException(str(exc))
+    if report.imported:
+        DataVersion.bump()
+        db.session.commit()
+    else:
+        db.session.rollback()
+    for line, message in report.errors:
+        click.echo(f'Zeile {line}: {message}', err=True)
+    click.echo(f'{report.rows} rows, {report.valid} valid, {report.imported} imported'
+               + (' (dry run)' if dry_run else ''))
+    if report.errors and not skip_invalid:
+        raise SystemExit(1)
+
+
+competitions_cli = AppGroup('competitions', help='Manage competitions.')
+
+
+@competitions_cli.command('list')
+def list_competitions():
+    """Show all competitions with their number of participants."""
+    rows = db.session.execute(
+        db.select(Competition.id, Competition.slug, Competition.name, db.func.count(Participant.id))
+        .outerjoin(Participant, Participant.competition_id == Competition.id)
+        .group_by(Competition.id)
+        .order_by(Competition.id)
+    )
+    for cid, slug, name, count in rows:
+        click.echo(f'{cid:>4}  {slug:<20} {name} ({count} participants)')
+
+
+@competitions_cli.command('create')
+@click.argument('name')
+@click.argument('slug')
+def create_competition(name, slug):
+    """Add a competition; SLUG is used in its public URLs (/c/SLUG/ranking)."""
+    if Competition.id_for_slug(slug) is not None:
+        raise click.ClickException(f'competition {slug!r} already exists')
+    competition = Competition.create(name, slug)
+    db.session.commit()
+    click.echo(f'created competition {competition.id} ({slug})')
+
+
+journal_cli = AppGroup('journal', help='Inspect and replay the results journal.')
+
+
+@journal_cli.command('status')
+def journal_status():
+    """Show the number of journaled events and the position of each consumer."""
+    count, last = db.session.execute(
+        db.select(db.func.count(ResultEvent.id), db.func.max(ResultEvent.id))
+    ).one()
+    click.echo(f'{count} events, last id {last or 0}')
+    positions = dict(db.session.execute(db.select(JournalCursor.name, JournalCursor.position)).all())
+    for name in journal.CONSUMERS:
+        click.echo(f'{name:<12} at {positions.get(name, 0)}')
+
+
+@journal_cli.command('replay')
+@click.argument('target', type=click.Path(dir_okay=False))
+def journal_replay(target):
+    """Replay the journal into the SQLite file TARGET.
+
+    A new file gets the schema, users, competitions, settings and
+    participants of this database, with all times rebuilt from the journal.
+    An existing copy (e.g. from `flask archive`) only receives newer events.
+    """
+    try:
+        report = journal.replay(os.path.abspath(target))
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    click.echo(f"{'created' if report['fresh'] else 'updated'} {target}: "
+               f"{report['events']} events, {report['cells']} times written, "
+               f"{report['skipped']} for unknown participants skipped")
+
+
+def register(app):
+    app.cli.add_command(photos_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(export_command)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(participants_cli)
+    app.cli.add_command(competitions_cli)
+    app.cli.add_command(journal_cli)
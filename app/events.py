@@ -0,0 +1,183 @@
+"""Server-Sent Events fan-out for the active participant.
+
+One hub per process checks the data version of every competition that has
+open streams and, if it moved, reloads that competition's active
+participant and wakes its streams, so N open Live/Stage screens cost one
+cheap query per competition instead of N. Writes in this process call
+``notify()`` to push the change immediately; changes made by another
+gunicorn worker are picked up by the next poll.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Channel:
+    """State of one competition's stream: last payload and its subscribers."""
+    __slots__ = ('subscribers', 'event_id', 'data', 'version')
+
+    def __init__(self):
+        self.subscribers = 0
+        self.event_id = None
+        self.data = None
+        self.version = None
+
+
+class ActiveParticipantHub:
+    def __init__(self, app=None):
+        self._app = None
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._channels = {}
+        self._streams = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SSE_POLL_INTERVAL', 2.0)
+        app.config.setdefault('SSE_KEEPALIVE', 15.0)
+        app.config.setdefault('SSE_MAX_STREAM_SECONDS', 300.0)
+        app.config.setdefault('SSE_RETRY_MS', 2000)
+        app.config.setdefault('SSE_MAX_STREAMS', 4)
+        self._app = app
+        app.extensions['active_hub'] = self
+
+    def _load(self):
+        """Build the payload shown on the Live/Stage screens."""
+        from app.models import Participant, SiteSettings, TIME_FIELDS
+
+        participant = Participant.active_row()
+        settings = SiteSettings.get_settings()
+        data = {'id': None, 'hide_prelim_rounds': bool(settings.hide_prelim_rounds)}
+        if participant is not None:
+            photo_url = None
+            if participant.photo:
+                photo_url = f"{self._app.static_url_path}/{participant.photo}"
+            data.update({
+                'id': participant.id,
+                'start_nr': participant.start_nr,
+                'first_name': participant.first_name,
+                'last_name': participant.last_name,
+                'city': participant.city,
+                'photo': photo_url,
+                **{field: getattr(participant, field) for field in TIME_FIELDS},
+                'toptime_Vorrunde': participant.toptime_Vorrunde,
+                'toptime_Zwischenrunde': participant.toptime_Zwischenrunde,
+                'toptime_Finalrunde': participant.toptime_Finalrunde,
+            })
+        return data
+
+    def refresh(self, competition_id):
+        """Reload a competition's active participant and wake its streams if it changed."""
+        from flask import g
+        from app.models import DataVersion
+
+        with self._cond:
+            channel = self._channels.get(competition_id)
+        if channel is None:
+            return
+        with self._app.app_context():
+            g.competition_id = competition_id
+            version = DataVersion.current()
+            if version and version == channel.version:
+                # Nothing was written since the last load
+                return
+            data = self._load()
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        # The id is derived from the content so it is identical across workers
+        event_id = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        with self._cond:
+            channel.version = version
+            if event_id != channel.event_id:
+                channel.event_id = event_id
+                channel.data = payload
+                self._cond.notify_all()
+
+    def notify(self):
+        """Ask the poller to re-check right away (call after committing)."""
+        self._wake.set()
+
+    def _ensure_poller(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='active-participant-hub', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        interval = self._app.config['SSE_POLL_INTERVAL']
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            with self._cond:
+                if not self._channels:
+                    # Idle: stop polling until the next screen connects
+                    self._thread = None
+                    return
+                competitions = list(self._channels)
+            for competition_id in competitions:
+                try:
+                    self.refresh(competition_id)
+                except Exception:
+                    logger.exception('Refreshing active participant failed')
+
+    def acquire_stream(self):
+        """Reserve one of ``SSE_MAX_STREAMS`` slots; False if this process is full.
+
+        Each open stream pins a gthread worker thread, so the cap keeps most
+        threads free for normal requests. Release with ``release_stream()``.
+        """
+        with self._cond:
+            if self._streams >= self._app.config['SSE_MAX_STREAMS']:
+                return False
+            self._streams += 1
+            return True
+
+    def release_stream(self):
+        with self._cond:
+            self._streams -= 1
+
+    def stream(self, competition_id, last_event_id=None):
+        """Generator yielding a competition's SSE frames until the stream's lifetime ends.
+
+        Streams are closed after ``SSE_MAX_STREAM_SECONDS`` so a gthread worker
+        thread is never held forever; the browser reconnects with
+        ``Last-Event-ID`` and only receives an event if something changed.
+        """
+        config = self._app.config
+        with self._cond:
+            channel = self._channels.get(competition_id)
+            if channel is None:
+                channel = self._channels[competition_id] = _Channel()
+            channel.subscribers += 1
+            running = self._thread is not None
+        try:
+            if not running or channel.version is None:
+                # Poller was idle or the channel is new, so the state may be stale
+                self.refresh(competition_id)
+            self._ensure_poller()
+            yield f"retry: {int(config['SSE_RETRY_MS'])}\n\n"
+            seen = last_event_id
+            deadline = time.monotonic() + config['SSE_MAX_STREAM_SECONDS']
+            while time.monotonic() < deadline:
+                with self._cond:
+                    if channel.event_id == seen:
+                        self._cond.wait(timeout=config['SSE_KEEPALIVE'])
+                    event_id, data = channel.event_id, channel.data
+                if event_id != seen:
+                    seen = event_id
+                    yield f"id: {event_id}\nevent: active\ndata: {data}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._cond:
+                channel.subscribers -= 1
+                if not channel.subscribers:
+                    self._channels.pop(competition_id, None)
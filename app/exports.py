@@ -0,0 +1,225 @@
+"""Streaming CSV/XLSX exports of the ranking and the participant list.
+
+Rows are read with ``yield_per`` and written out chunk by chunk, so memory
+use does not depend on the number of participants. The XLSX writer emits a
+minimal workbook (one sheet, inline strings) through ``zipfile`` on a
+non-seekable sink, which needs no extra dependency and never holds the
+whole file either.
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from app import db
+from app.models import Participant, Run, TIME_SLOTS
+
+BATCH_SIZE = 500
+_CHUNK_SIZE = 64 * 1024
+
+# (header, column, prelim round only)
+_TIME_COLUMNS = [
+    ('VR1', 'time1', True),
+    ('VR2', 'time2', True),
+    ('VR3', 'time3', True),
+    ('Top VR', 'toptime_Vorrunde', True),
+    ('ZR1', 'time4', False),
+    ('ZR2', 'time5', False),
+    ('Top ZR', 'toptime_Zwischenrunde', False),
+    ('Final', 'time6', False),
+    ('Top Final', 'toptime_Finalrunde', False),
+]
+_PERSON_COLUMNS = [
+    ('Start Nr.', 'start_nr', False),
+    ('Vorname', 'first_name', False),
+    ('Name', 'last_name', False),
+]
+_CONTACT_COLUMNS = [
+    ('Adresse', 'address', False),
+    ('PLZ', 'postal_code', False),
+    ('Ort', 'city', False),
+    ('Email', 'email', False),
+    ('Telefon', 'phone', False),
+]
+_QUALIFICATION_COLUMNS = [
+    ('Q VR1', 'round1_qualified', True),
+    ('Q VR2', 'round2_qualified', True),
+    ('Q VR3', 'round3_qualified', True),
+    ('Q ZR', 'zwischenrunde_qualified', False),
+    ('Q Final', 'final_qualified', False),
+]
+
+EXPORTS = {
+    # Public without login: only what the ranking page shows, no contact data
+    'ranking': [('Rang', 'rank', False)] + _PERSON_COLUMNS + _TIME_COLUMNS,
+    'participants': (
+        _PERSON_COLUMNS + _CONTACT_COLUMNS + _TIME_COLUMNS + _QUALIFICATION_COLUMNS
+        + [('Rang', 'rank', False)]
+    ),
+}
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def columns(kind, hide_prelim_rounds):
+    """``(header, column)`` pairs of an export; prelim rounds dropped if hidden."""
+    return [
+        (header, name) for header, name, prelim in EXPORTS[kind]
+        if not (prelim and hide_prelim_rounds)
+    ]
+
+
+def iter_rows(kind, hide_prelim_rounds):
+    """Yield one tuple per participant, streamed from the database."""
+    selected = columns(kind, hide_prelim_rounds)
+    rank = db.func.row_number().over(order_by=Participant.ranking_order()).label('rank')
+    fields = [
+        rank if name == 'rank'
+        else Run.time_of(*TIME_SLOTS[name]) if name in TIME_SLOTS
+        else getattr(Participant, name)
+        for _header, name in selected
+    ]
+    query = db.select(*fields).where(Participant.in_competition())
+    if kind == 'ranking':
+        query = query.order_by(*Participant.ranking_order())
+    else:
+        query = query.order_by(Participant.start_nr.nulls_last(), Participant.id)
+    result = db.session.execute(query.execution_options(yield_per=BATCH_SIZE))
+    for row in result:
+        yield tuple(row)
+
+
+def iter_csv(header, rows):
+    """Encode rows as CSV (``;``-separated, UTF-8 with BOM for Excel) in chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([
+            '' if value is None else int(value) if isinstance(value, bool) else value
+            for value in row
+        ])
+        if buffer.tell() >= _CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _Sink:
+    """Write-only, non-seekable file object collecting what ``zipfile`` writes."""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    @property
+    def size(self):
+        return self._size
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self._size = 0
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values, letters):
+    cells = []
+    for letter, value in zip(letters, values):
+        ref = f'{letter}{number}'
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def iter_xlsx(header, rows, sheet_name='Export'):
+    """Encode rows as a single-sheet XLSX workbook, yielding compressed chunks."""
+    sink = _Sink()
+    letters = [_column_letter(index) for index in range(len(header))]
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_xlsx_row(1, header, letters).encode('utf-8'))
+            for number, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(number, row, letters).encode('utf-8'))
+                if sink.size >= _CHUNK_SIZE:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def iter_export(kind, fmt, hide_prelim_rounds):
+    """Byte chunks of an export in ``fmt`` (``csv`` or ``xlsx``)."""
+    header = [header for header, _name in columns(kind, hide_prelim_rounds)]
+    rows = iter_rows(kind, hide_prelim_rounds)
+    if fmt == 'xlsx':
+        return iter_xlsx(header, rows, sheet_name='Rangliste' if kind == 'ranking' else 'Teilnehmer')
+    return iter_csv(header, rows)
@@ -1,8 +1,8 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, IntegerField, HiddenField, FloatField, SelectField
-from wtforms.validators import DataRequired, ValidationError, Email, EqualTo, Optional
-from app.models import User, Participant
+from wtforms.validators import DataRequired, ValidationError, Email, EqualTo, Optional, InputRequired, NumberRange, Length, Regexp
+from app.models import User, Competition, Participant
 
 class LoginForm(FlaskForm):
     username = StringField('Benutzername', validators=[DataRequired()])
@@ -78,7 +78,7 @@ class ParticipantForm(FlaskForm):
         except (TypeError, ValueError):
             current_id = None
 
-        query = Participant.query.filter(Participant.start_nr == start_nr.data)
+        query = Participant.scoped().filter(Participant.start_nr == start_nr.data)
         if current_id is not None:
             query = query.filter(Participant.id != current_id)
         if query.first():
@@ -91,6 +91,29 @@ class ParticipantForm(FlaskForm):
             return None
 
 
+class ParticipantImportForm(FlaskForm):
+    file = FileField('CSV-Datei', validators=[FileRequired(), FileAllowed(['csv', 'txt'], 'Nur CSV-Dateien!')])
+    dry_run = BooleanField('Nur prüfen (nichts speichern)', default=True)
+    skip_invalid = BooleanField('Fehlerhafte Zeilen überspringen')
+    submit = SubmitField('Importieren')
+
+
+class CompetitionForm(FlaskForm):
+    name = StringField('Name', validators=[DataRequired(), Length(max=64)])
+    slug = StringField('Kürzel (für URLs)', validators=[
+        DataRequired(), Length(max=64),
+        Regexp(r'^[a-z0-9][a-z0-9-]*$', message='Nur Kleinbuchstaben, Ziffern und Bindestriche.'),
+    ])
+    submit = SubmitField('Erstellen')
+
+    def validate_slug(self, slug):
+        if Competition.id_for_slug(slug.data) is not None:
+            raise ValidationError('Dieses Kürzel ist bereits vergeben.')
+
+
 class AdminSettingsForm(FlaskForm):
     hide_prelim_rounds = BooleanField('Vorrunden ausblenden (ohne Vorrunden)')
+    prelim_threshold = FloatField('Vorrunde: direkte Qualifikation ab (Sekunden)', validators=[InputRequired(), NumberRange(min=0)])
+    prelim_min_qualified = IntegerField('Vorrunde: mindestens qualifiziert', validators=[InputRequired(), NumberRange(min=0)])
+    intermediate_top_n = IntegerField('Zwischenrunde: Anzahl Finalisten', validators=[InputRequired(), NumberRange(min=0)])
     submit = SubmitField('Speichern')
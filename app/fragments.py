@@ -0,0 +1,182 @@
+"""Cache for rendered HTML fragments (the ranking rows).
+
+Keys include the data version, so every write makes the old entries
+unreachable and no explicit invalidation is needed; the backends only have
+to stay bounded. ``memory`` keeps an LRU per process, ``sqlite`` stores the
+fragments in a small local SQLite file that all gunicorn workers on the host
+share, so a fragment rendered by one worker is a hit for the others.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Fragments in a local SQLite file shared by the workers of one host."""
+
+    def __init__(self, path, max_entries):
+        self._path = path
+        self._max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and process (never reused across a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS fragment '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM fragment WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO fragment (key, value, stored_at) VALUES (?, ?, ?)',
+            (key, value, time.time()),
+        )
+        # Entries of older data versions are never read again; keep the newest
+        conn.execute(
+            'DELETE FROM fragment WHERE key NOT IN '
+            '(SELECT key FROM fragment ORDER BY stored_at DESC LIMIT ?)',
+            (self._max_entries,),
+        )
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM fragment').fetchone()[0]
+
+    def clear(self):
+        self._connection().execute('DELETE FROM fragment')
+
+
+class FragmentCache:
+    def __init__(self, app=None):
+        self._app = None
+        self._backend = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_BACKEND', 'memory')
+        app.config.setdefault('FRAGMENT_CACHE_PATH', None)
+        app.config.setdefault('FRAGMENT_CACHE_MAX_ENTRIES', 64)
+        self._app = app
+        self._backend = self._create_backend(app.config)
+        app.extensions['fragments'] = self
+
+    @staticmethod
+    def _create_backend(config):
+        max_entries = config['FRAGMENT_CACHE_MAX_ENTRIES']
+        if config['FRAGMENT_CACHE_BACKEND'] == 'sqlite':
+            path = config['FRAGMENT_CACHE_PATH']
+            if not path:
+                # One file per database, so two apps on a host never mix keys
+                uri = config.get('SQLALCHEMY_DATABASE_URI', '')
+                digest = hashlib.sha1(uri.encode('utf-8')).hexdigest()[:12]
+                path = os.path.join(tempfile.gettempdir(), f'bullriding-fragments-{digest}.db')
+            return SQLiteBackend(path, max_entries)
+        return MemoryBackend(max_entries)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_render(self, name, key_parts, render):
+        """Return the cached fragment for ``name``/``key_parts`` or render it.
+
+        ``key_parts`` must identify everything the fragment depends on (data
+        version, settings, theme). Backend errors are logged and the fragment
+        is rendered uncached rather than failing the request.
+        """
+        key = ':'.join([name, *map(str, key_parts)])
+        try:
+            cached = self._backend.get(key)
+        except sqlite3.Error:
+            logger.exception('Fragment cache read failed')
+            self._count('_errors')
+            cached = None
+        if cached is not None:
+            self._count('_hits')
+            return Markup(cached)
+        self._count('_misses')
+        value = str(render())
+        try:
+            self._backend.set(key, value)
+        except sqlite3.Error:
+            logger.exception('Fragment cache write failed')
+            self._count('_errors')
+        return Markup(value)
+
+    def stats(self):
+        """Counters of this worker process plus the backend size."""
+        with self._lock:
+            hits, misses, errors = self._hits, self._misses, self._errors
+        lookups = hits + misses
+        try:
+            entries = self._backend.size()
+        except sqlite3.Error:
+            entries = None
+        return {
+            'backend': self._app.config['FRAGMENT_CACHE_BACKEND'],
+            'pid': os.getpid(),
+            'hits': hits,
+            'misses': misses,
+            'errors': errors,
+            'hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'entries': entries,
+        }
+
+    def clear(self):
+        self._backend.clear()
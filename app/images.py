@@ -0,0 +1,270 @@
+"""Participant photo storage and resized variants (list thumbnail, stage size).
+
+Uploads are stored content-addressed as ``uploads/<sha256 prefix>.<ext>``:
+identical photos are kept once and a URL never changes meaning, so it can
+be cached forever. Variants are stored next to the original as
+``<name>.<variant>.jpg`` and referenced from templates through
+``photo_url`` / ``photo_srcset``. If Pillow is not installed, no variants
+are generated and the original is served as before.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, url_for
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: only threads are serialized
+    fcntl = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+HASH_LENGTH = 32
+_CHUNK_SIZE = 64 * 1024
+_CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{%d}(\.[a-z]+)?\.[a-z0-9]+$' % HASH_LENGTH)
+_LOCK_FILE = '.photos.lock'
+_thread_lock = threading.Lock()
+
+
+def _sizes():
+    return current_app.config['PHOTO_SIZES']
+
+
+def is_content_addressed(photo):
+    """True for ``uploads/<hash>.<ext>`` files and their variants."""
+    directory, filename = os.path.split(photo)
+    return directory == 'uploads' and bool(_CONTENT_ADDRESSED.match(filename))
+
+
+@contextmanager
+def _files_locked():
+    """Serialize storing and deleting uploads across threads and worker processes.
+
+    A deleter holding the lock sees either the file as stored (with a fresh
+    mtime) or no file, in which case the uploader writes it again.
+    """
+    with _thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(current_app.config['UPLOAD_FOLDER'], _LOCK_FILE), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _is_recent(path, min_age):
+    """True if ``path`` was written or reused less than ``min_age`` seconds ago."""
+    try:
+        return time.time() - os.path.getmtime(path) < min_age
+    except OSError:
+        return False
+
+
+def _store_stream(stream, ext):
+    """Copy ``stream`` into uploads while hashing it; returns the relative path."""
+    upload_dir = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    # Temp file in the same directory so the final rename is atomic
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                tmp.write(chunk)
+        filename = f'{digest.hexdigest()[:HASH_LENGTH]}{ext}'
+        target = os.path.join(upload_dir, filename)
+        with _files_locked():
+            if os.path.exists(target):
+                # Same content is already stored: keep the existing file, but mark it
+                # as in use so a concurrent release or cleanup does not delete it
+                # before the participant referencing it is committed
+                os.utime(target)
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return f'uploads/{filename}'
+
+
+def _normalized_ext(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return '.jpg' if ext == '.jpeg' else ext
+
+
+def store_upload(file_storage):
+    """Store an uploaded ``FileStorage`` content-addressed; returns the photo path."""
+    return _store_stream(file_storage.stream, _normalized_ext(file_storage.filename))
+
+
+def rehash_photo(photo):
+    """Move a legacy (name-based) photo to content-addressed storage."""
+    source = os.path.join(current_app.static_folder, photo)
+    with open(source, 'rb') as stream:
+        return _store_stream(stream, _normalized_ext(photo))
+
+
+def variant_path(photo, variant):
+    """Relative static path of a variant, e.g. ``uploads/a_1.thumb.jpg``."""
+    base, _ext = os.path.splitext(photo)
+    return f'{base}.{variant}.jpg'
+
+
+def is_variant(filename):
+    """True for files generated by this module (skipped when scanning uploads)."""
+    if filename.startswith('.upload-') or filename == _LOCK_FILE:
+        # Upload still being written by ``store_upload``, or the lock file
+        return True
+    base, ext = os.path.splitext(filename)
+    return ext.lower() == '.jpg' and os.path.splitext(base)[1][1:] in _sizes()
+
+
+def generate_variants(photo, static_folder=None, force=False):
+    """Create all configured variants for ``photo``; returns the paths written."""
+    if Image is None:
+        logger.warning('Pillow is not installed; skipping photo variants for %s', photo)
+        return []
+    static_folder = static_folder or current_app.static_folder
+    if not force and is_content_addressed(photo) and all(
+        os.path.exists(os.path.join(static_folder, variant_path(photo, variant)))
+        for variant in _sizes()
+    ):
+        # Same content was uploaded before; its variants are still valid
+        return []
+    quality = current_app.config['PHOTO_QUALITY']
+    written = []
+    with Image.open(os.path.join(static_folder, photo)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        for variant, width in _sizes().items():
+            resized = image.copy()
+            # Bound the width (srcset uses width descriptors); never upscales
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            target = variant_path(photo, variant)
+            resized.save(
+                os.path.join(static_folder, target),
+                'JPEG', quality=quality, optimize=True, progressive=True,
+            )
+            written.append(target)
+    return written
+
+
+def release_photo(photo, min_age=60):
+    """Delete ``photo`` and its variants once no participant references it.
+
+    Content-addressed files can be shared by several participants, so this
+    is the reference-counted counterpart of ``remove_photo``. Files stored
+    or reused less than ``min_age`` seconds ago are kept: their participant
+    may not be committed yet (``cleanup_orphan_photos`` sweeps them later).
+    """
+    return bool(release_photos([photo], min_age=min_age))
+
+
+def release_photos(photos, min_age=60):
+    """``release_photo`` for many photos with one reference query; returns the ones removed."""
+    from app import db
+    from app.models import Participant
+
+    photos = set(photos)
+    if not photos:
+        return []
+    static_folder = current_app.static_folder
+    with _files_locked():
+        # Checked under the lock, right before deleting
+        referenced = set(db.session.execute(
+            db.select(Participant.photo).where(Participant.photo.in_(photos)).distinct()
+        ).scalars())
+        removed = sorted(
+            photo for photo in photos - referenced
+            if not _is_recent(os.path.join(static_folder, photo), min_age)
+        )
+        for photo in removed:
+            remove_photo(photo, static_folder)
+    return removed
+
+
+def remove_photo(photo, static_folder=None):
+    """Delete the original and all variants; missing files are ignored."""
+    static_folder = static_folder or current_app.static_folder
+    for path in [photo] + [variant_path(photo, variant) for variant in _sizes()]:
+        try:
+            os.remove(os.path.join(static_folder, path))
+        except OSError:
+            pass
+
+
+def _variant_exists(photo, variant):
+    return os.path.exists(os.path.join(current_app.static_folder, variant_path(photo, variant)))
+
+
+def photo_url(photo, variant=None):
+    """URL of a variant, falling back to the original if it was not generated."""
+    if variant and _variant_exists(photo, variant):
+        return url_for('static', filename=variant_path(photo, variant))
+    return url_for('static', filename=photo)
+
+
+def photo_srcset(photo):
+    """``srcset`` value listing the generated variants by width."""
+    return ', '.join(
+        f"{url_for('static', filename=variant_path(photo, variant))} {width}w"
+        for variant, width in sorted(_sizes().items(), key=lambda item: item[1])
+        if _variant_exists(photo, variant)
+    )
+
+
+def cleanup_orphan_photos(min_age=600):
+    """Remove uploads no participant points to; returns the files removed.
+
+    Files younger than ``min_age`` seconds are kept so an upload whose
+    participant is not committed yet is never swept away.
+    """
+    from app.models import Participant
+
+    upload_dir = current_app.config['UPLOAD_FOLDER']
+    static_folder = current_app.static_folder
+    removed = []
+    with _files_locked():
+        # A participant committed after this query points to a file stored or
+        # reused since, which the age check below keeps
+        referenced = set()
+        for (photo,) in Participant.query.with_entities(Participant.photo).filter(Participant.photo.isnot(None)):
+            referenced.add(photo)
+            referenced.update(variant_path(photo, variant) for variant in _sizes())
+        for filename in os.listdir(upload_dir):
+            path = os.path.join(upload_dir, filename)
+            relative = os.path.relpath(path, static_folder).replace('\\', '/')
+            if relative in referenced or filename == _LOCK_FILE or not os.path.isfile(path):
+                continue
+            if _is_recent(path, min_age):
+                continue
+            try:
+                os.remove(path)
+                removed.append(relative)
+            except OSError:
+                logger.warning('Could not remove orphaned photo %s', relative)
+    return removed
@@ -0,0 +1,214 @@
+"""Bulk import of participants from a CSV registration list.
+
+Rows are streamed and validated in one pass: required fields, field
+lengths, email format and start numbers, the latter against the file
+itself and against all existing participants loaded with one query. Valid
+rows are inserted in ``executemany`` batches inside one transaction, so an
+import either lands completely or (on errors, or as a dry run) not at all.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from email_validator import EmailNotValidError, validate_email
+
+from app import db
+from app.models import Participant, current_competition_id
+
+BATCH_SIZE = 1000
+
+# Accepted header names (case-insensitive) per column; the export headers
+# and the model attribute names both work.
+HEADERS = {
+    'start_nr': ('start_nr', 'start nr.', 'start nr', 'startnummer', 'nr.', 'nr'),
+    'first_name': ('first_name', 'vorname'),
+    'last_name': ('last_name', 'name', 'nachname'),
+    'address': ('address', 'adresse', 'addresse', 'strasse'),
+    'postal_code': ('postal_code', 'plz'),
+    'city': ('city', 'ort'),
+    'email': ('email', 'e-mail', 'mail'),
+    'phone': ('phone', 'telefon', 'tel'),
+}
+REQUIRED = ('first_name', 'last_name', 'address', 'postal_code', 'city', 'email')
+_LABELS = {
+    'start_nr': 'Start Nr.', 'first_name': 'Vorname', 'last_name': 'Name', 'address': 'Adresse',
+    'postal_code': 'PLZ', 'city': 'Ort', 'email': 'Email', 'phone': 'Telefon',
+}
+
+
+class ImportFileError(ValueError):
+    """The file cannot be read as a participant list; the message is user-facing."""
+
+
+@dataclass
+class ImportReport:
+    """Outcome of an import; ``errors`` holds ``(line, message)`` pairs."""
+    rows: int = 0
+    valid: int = 0
+    imported: int = 0
+    dry_run: bool = False
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def _header_map(header):
+    """Map column names to their index in the file's header row."""
+    aliases = {alias: name for name, names in HEADERS.items() for alias in names}
+    mapping = {}
+    for index, title in enumerate(header):
+        name = aliases.get(title.strip().lower())
+        if name is not None and name not in mapping:
+            mapping[name] = index
+    missing = [_LABELS[name] for name in REQUIRED if name not in mapping]
+    if missing:
+        raise ImportFileError(f"Spalten fehlen: {', '.join(missing)}.")
+    return mapping
+
+
+_NOT_UTF8 = 'Die Datei muss UTF-8-kodiert sein.'
+
+
+def _rows(reader):
+    """Yield ``(line, values)``; decoding and CSV errors become ``ImportFileError``.
+
+    The file is decoded while it is read, so a bad byte anywhere in it
+    surfaces here and not only in the header line.
+    """
+    try:
+        for values in reader:
+            # The header line was read before the reader started counting
+            yield reader.line_num + 1, values
+    except UnicodeDecodeError:
+        raise ImportFileError(_NOT_UTF8)
+    except csv.Error as exc:
+        raise ImportFileError(f'Zeile {reader.line_num + 1} kann nicht gelesen werden: {exc}.')
+
+
+def _open_csv(stream):
+    """Header mapping and ``(line, values)`` rows of a binary stream.
+
+    Detects ``;``, ``,`` or tab as separator.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        first_line = text.readline()
+        if not first_line.strip():
+            raise ImportFileError('Die Datei ist leer.')
+        delimiter = max(';,\t', key=first_line.count)
+        header = next(csv.reader([first_line], delimiter=delimiter))
+    except UnicodeDecodeError:
+        raise ImportFileError(_NOT_UTF8)
+    except csv.Error as exc:
+        raise ImportFileError(f'Kopfzeile kann nicht gelesen werden: {exc}.')
+    return _header_map(header), _rows(csv.reader(text, delimiter=delimiter))
+
+
+def _lengths():
+    return {
+        name: getattr(Participant, name).type.length
+        for name in HEADERS if name != 'start_nr'
+    }
+
+
+def _parse_row(values, mapping, lengths):
+    """Build insert parameters for one row; returns ``(params, errors)``."""
+    params, errors = {}, []
+    for name, index in mapping.items():
+        value = values[index].strip() if index < len(values) else ''
+        if name == 'start_nr':
+            if not value:
+                params[name] = None
+                continue
+            try:
+                number = int(value)
+            except ValueError:
+                errors.append(f'Start Nr. {value!r} ist keine Zahl.')
+                continue
+            if number <= 0:
+                errors.append(f'Start Nr. {value!r} muss positiv sein.')
+                continue
+            params[name] = number
+            continue
+        if not value:
+            if name in REQUIRED:
+                errors.append(f'{_LABELS[name]} fehlt.')
+            params[name] = None
+            continue
+        if len(value) > lengths[name]:
+            errors.append(f'{_LABELS[name]} ist länger als {lengths[name]} Zeichen.')
+            continue
+        if name == 'email':
+            try:
+                validate_email(value, check_deliverability=False)
+            except EmailNotValidError:
+                errors.append(f'Ungültige Email {value!r}.')
+                continue
+        params[name] = value
+    params.setdefault('start_nr', None)
+    params.setdefault('phone', None)
+    return params, errors
+
+
+def import_participants(stream, dry_run=False, skip_invalid=False, qualified=False):
+    """Import participants from a CSV ``stream`` (binary) in the current transaction.
+
+    With errors nothing is kept unless ``skip_invalid`` is set, in which
+    case only the invalid rows are left out. ``qualified`` sets the
+    flags a rider added through the form gets while the prelim rounds are
+    hidden (``Participant.initial_flags``).
+    The caller commits if ``report.imported`` is non-zero and rolls back
+    otherwise, since earlier batches may already have been sent.
+    """
+    mapping, rows = _open_csv(stream)
+    lengths = _lengths()
+    # One set-based lookup for the start numbers already taken in this competition
+    taken = {
+        number for (number,) in db.session.execute(
+            db.select(Participant.start_nr).where(
+                Participant.in_competition(), Participant.start_nr.isnot(None)
+            )
+        )
+    }
+    seen = {}
+    # Same flags as a participant added through the form
+    flags = {'competition_id': current_competition_id(), **Participant.initial_flags(qualified)}
+    report = ImportReport(dry_run=dry_run)
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            db.session.execute(db.insert(Participant), batch)
+            report.imported += len(batch)
+        batch.clear()
+
+    for line, values in rows:
+        if not any(value.strip() for value in values):
+            continue
+        report.rows += 1
+        params, errors = _parse_row(values, mapping, lengths)
+        number = params['start_nr']
+        if number is not None:
+            if number in taken:
+                errors.append(f'Start Nr. {number} ist bereits vergeben.')
+            elif number in seen:
+                errors.append(f'Start Nr. {number} kommt bereits in Zeile {seen[number]} vor.')
+            else:
+                seen[number] = line
+        if errors:
+            report.errors.extend((line, message) for message in errors)
+            continue
+        report.valid += 1
+        if report.errors and not skip_invalid:
+            # The import will be rolled back; keep validating only
+            continue
+        batch.append({**params, **flags})
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if report.errors and not skip_invalid:
+        report.imported = 0
+        batch.clear()
+    flush()
+    return report
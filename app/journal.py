@@ -0,0 +1,216 @@
+"""Append-only results journal and the consumers that derive data from it.
+
+Every time change is recorded as a ``ResultEvent`` (who, participant,
+round/attempt, old and new value) in the transaction that makes it. Derived
+data is maintained by consumers: each remembers the last event it applied
+in ``journal_cursor`` and on ``catch_up()`` processes only the newer events,
+so a write costs work proportional to what changed, never a full rebuild.
+Writers hold SQLite's write lock while catching up, so events are consumed
+in commit order and exactly once.
+
+``replay()`` feeds the journal into another database: a fresh one (master
+data is copied, all times come from the journal) or an archived snapshot
+(only the events after its last one are applied).
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from flask import has_request_context
+from flask_login import current_user
+
+from app import db
+from app.models import (DataVersion, JournalCursor, Participant, ResultEvent, Run,
+                        current_competition_id)
+
+_CHUNK = 5000
+
+
+def _actor():
+    if has_request_context() and current_user.is_authenticated:
+        return int(current_user.get_id())
+    return None
+
+
+def record(changes):
+    """Journal ``[{participant_id, round, attempt, old_time, new_time}]`` with one executemany."""
+    if not changes:
+        return
+    stamp = {
+        'competition_id': current_competition_id(),
+        'user_id': _actor(),
+        'created_at': datetime.utcnow(),
+    }
+    # Core insert: the ORM would split the rows by which of them hold None
+    db.session.execute(ResultEvent.__table__.insert(), [{**change, **stamp} for change in changes])
+
+
+def record_clear(participant_ids):
+    """Journal the removal of every run of ``participant_ids`` (a SELECT of ids), set-based.
+
+    Call before deleting the runs; one INSERT ... SELECT regardless of size.
+    """
+    columns = ('competition_id', 'participant_id', 'round', 'attempt',
+               'old_time', 'new_time', 'user_id', 'created_at')
+    rows = (
+        db.select(
+            Participant.competition_id,
+            Run.participant_id,
+            Run.round,
+            Run.attempt,
+            Run.time,
+            sa.null(),
+            sa.literal(_actor(), sa.Integer),
+            sa.literal(datetime.utcnow(), sa.DateTime),
+        )
+        .join(Participant, Participant.id == Run.participant_id)
+        .where(Run.participant_id.in_(participant_ids))
+    )
+    db.session.execute(db.insert(ResultEvent).from_select(columns, rows))
+
+
+def _refresh_toptimes(executor, position):
+    """Consumer: recompute the top times of the participants named in events after ``position``."""
+    touched = db.select(ResultEvent.participant_id).where(ResultEvent.id > position)
+    executor.execute(
+        Participant.toptimes_update().where(Participant.id.in_(touched)),
+        execution_options={'synchronize_session': False},
+    )
+
+
+# Consumer name -> callable(executor, position); ``position`` is a SQL expression
+# for the last event the consumer has applied
+CONSUMERS = {
+    'toptimes': _refresh_toptimes,
+}
+
+
+def catch_up(executor=None):
+    """Apply new events to every consumer and advance the cursors.
+
+    Two statements per consumer, with the cursor read inside them. Must run
+    in a transaction that already wrote (i.e. holds the write lock), so no
+    event can commit between the two. ``executor`` is ``db.session``
+    (default) or a Connection of another database (``replay``).
+    """
+    executor = executor if executor is not None else db.session
+    last = db.select(db.func.coalesce(db.func.max(ResultEvent.id), 0)).scalar_subquery()
+    for name, consumer in CONSUMERS.items():
+        position = db.select(JournalCursor.position).where(JournalCursor.name == name).scalar_subquery()
+        consumer(executor, db.func.coalesce(position, 0))
+        updated = executor.execute(
+            db.update(JournalCursor).where(JournalCursor.name == name).values(position=last),
+            execution_options={'synchronize_session': False},
+        ).rowcount
+        if not updated:
+            executor.execute(db.insert(JournalCursor).values(name=name, position=last))
+
+
+# Copied into a fresh database before the journal is replayed; times are not
+# copied, they are rebuilt from the events
+_MASTER_TABLES = ('user', 'competition', 'site_settings', 'data_version', 'participant', 'live_state')
+_DERIVED_COLUMNS = ('toptime_Vorrunde', 'toptime_Zwischenrunde', 'toptime_Finalrunde')
+
+
+def _copy_master_data(conn):
+    for name in _MASTER_TABLES:
+        table = db.metadata.tables[name]
+        result = db.session.execute(db.select(table)).mappings()
+        while True:
+            rows = [dict(row) for row in result.fetchmany(_CHUNK)]
+            if not rows:
+                break
+            if name == 'participant':
+                for row in rows:
+                    row.update(dict.fromkeys(_DERIVED_COLUMNS))
+            conn.execute(table.insert(), rows)
+    # Keep the schema version so `flask db upgrade` works on the copy
+    version = None
+    if sa.inspect(db.engine).has_table('alembic_version'):
+        version = db.session.execute(sa.text('SELECT version_num FROM alembic_version')).scalar()
+    if version is not None:
+        conn.execute(sa.text('CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)'))
+        conn.execute(sa.text('INSERT INTO alembic_version VALUES (:v)'), {'v': version})
+
+
+def _apply_cells(conn, cells, known):
+    """Write the final value of each replayed cell; returns (applied, skipped)."""
+    upserts, deletes, skipped = [], [], 0
+    for (pid, round_name, attempt), (competition_id, value) in cells.items():
+        if pid not in known:
+            skipped += 1
+            continue
+        key = {'participant_id': pid, 'round': round_name, 'attempt': attempt}
+        if value is None:
+            deletes.append(key)
+        else:
+            upserts.append({**key, 'time': value, 'competition_id': competition_id})
+    run = Run.__table__
+    if deletes:
+        conn.execute(
+            run.delete().where(
+                run.c.participant_id == sa.bindparam('participant_id'),
+                run.c.round == sa.bindparam('round'),
+                run.c.attempt == sa.bindparam('attempt'),
+            ),
+            deletes,
+        )
+    if upserts:
+        # Replay targets are SQLite files (see replay())
+        statement = sqlite_insert(run)
+        conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[run.c.participant_id, run.c.round, run.c.attempt],
+                set_={'time': statement.excluded.time},
+            ),
+            upserts,
+        )
+    return len(upserts) + len(deletes), skipped
+
+
+def replay(target_path):
+    """Replay this database's journal into the SQLite file ``target_path``.
+
+    A missing or empty file is created with the current schema and master
+    data. An existing copy (e.g. a snapshot from ``flask archive``) only
+    receives the events after its own last one. Events of participants the
+    target does not know are journaled but not applied. Returns a dict with
+    the counts of events and cells.
+    """
+    engine = sa.create_engine(f'sqlite:///{target_path}')
+    try:
+        fresh = not sa.inspect(engine).has_table('participant')
+        with engine.begin() as conn:
+            if fresh:
+                db.metadata.create_all(conn)
+                _copy_master_data(conn)
+            elif not sa.inspect(conn).has_table('result_event'):
+                raise ValueError(f'{target_path} predates the results journal; replay into a new file instead.')
+            elif 'competition_id' not in {column['name'] for column in sa.inspect(conn).get_columns('run')}:
+                raise ValueError(f'{target_path} has an older schema; run `flask db upgrade` on it first.')
+            start = conn.execute(db.select(db.func.max(ResultEvent.id))).scalar() or 0
+            known = set(conn.execute(db.select(Participant.id)).scalars())
+
+            # Later events overwrite earlier ones per cell, so only the last value is written
+            cells, events = {}, 0
+            result = db.session.execute(
+                db.select(ResultEvent.__table__).where(ResultEvent.id > start).order_by(ResultEvent.id)
+            ).mappings()
+            while True:
+                rows = [dict(row) for row in result.fetchmany(_CHUNK)]
+                if not rows:
+                    break
+                conn.execute(ResultEvent.__table__.insert(), rows)
+                for row in rows:
+                    cells[(row['participant_id'], row['round'], row['attempt'])] = (
+                        row['competition_id'], row['new_time'],
+                    )
+                events += len(rows)
+            applied, skipped = _apply_cells(conn, cells, known)
+            # Participants without events have no runs; their top times stay NULL
+            catch_up(conn)
+            if events:
+                conn.execute(db.update(DataVersion).values(version=DataVersion.version + 1))
+    finally:
+        engine.dispose()
+    return {'fresh': fresh, 'events': events, 'cells': applied, 'skipped': skipped}
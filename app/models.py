@@ -1,4 +1,9 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from app import db, login
@@ -16,14 +21,195 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+class AuthUser(UserMixin):
+    """Identity used as ``current_user``: only the columns the request path needs.
+
+    The password hash is never loaded here; routes that need the full row
+    (e.g. ``change_password``) fetch ``User`` explicitly.
+    """
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+
+class _IdentityCache:
+    """Small thread-safe LRU cache with a TTL for ``load_user``."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+_identity_cache = _IdentityCache()
+
+
+def invalidate_user(user_id):
+    """Make every worker reload cached identities, e.g. after a password change.
+
+    Call inside the transaction that changed the user: the bumped stamp in
+    ``data_version`` tells the other processes their entries are stale.
+    """
+    DataVersion.bump_users()
+    _identity_cache.invalidate(int(user_id))
+
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    try:
+        user_id = int(id)
+    except (TypeError, ValueError):
+        return None
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    # Entries are valid as long as the users stamp has not moved, in any worker
+    stamp = DataVersion.users_stamp()
+    cached = _identity_cache.get(user_id, ttl)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    identity = AuthUser(*row)
+    _identity_cache.set(user_id, (stamp, identity))
+    return identity
+
+class Competition(db.Model):
+    """One event (or category) with its own participants, settings and results.
+
+    The slug appears in public URLs (``/c/<slug>/ranking``) and never
+    changes, so id/slug lookups are cached per process.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    slug = db.Column(db.String(64), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # slug -> id and id -> slug of existing competitions, per process
+    _ids = {}
+    _slugs = {}
+    _default_id = None
+
+    @classmethod
+    def id_for_slug(cls, slug):
+        """Id of the competition with ``slug``, or None."""
+        cid = cls._ids.get(slug)
+        if cid is None:
+            cid = db.session.execute(db.select(cls.id).where(cls.slug == slug)).scalar()
+            if cid is not None:
+                cls._ids[slug], cls._slugs[cid] = cid, slug
+        return cid
+
+    @classmethod
+    def slug_for_id(cls, cid):
+        """Slug of the competition ``cid``, or None if it does not exist."""
+        slug = cls._slugs.get(cid)
+        if slug is None:
+            slug = db.session.execute(db.select(cls.slug).where(cls.id == cid)).scalar()
+            if slug is not None:
+                cls._ids[slug], cls._slugs[cid] = cid, slug
+        return slug
+
+    @classmethod
+    def default_id(cls):
+        """The competition served without a slug: ``DEFAULT_COMPETITION`` or the oldest one."""
+        if cls._default_id is None:
+            slug = current_app.config.get('DEFAULT_COMPETITION')
+            cid = cls.id_for_slug(slug) if slug else None
+            if cid is None:
+                cid = db.session.execute(db.select(db.func.min(cls.id))).scalar()
+            cls._default_id = cid
+        return cls._default_id
+
+    @classmethod
+    def current(cls):
+        """The competition of the current request (navbar, admin pages)."""
+        return db.session.get(cls, current_competition_id())
+
+    @classmethod
+    def create(cls, name, slug):
+        """Add a competition with default settings in the current transaction."""
+        competition = cls(name=name, slug=slug)
+        db.session.add(competition)
+        db.session.flush()
+        db.session.add(SiteSettings(competition_id=competition.id))
+        db.session.add(LiveState(competition_id=competition.id))
+        db.session.add(DataVersion(
+            id=competition.id, version=1, settings_version=1, users_version=DataVersion.users_max(),
+        ))
+        return competition
+
+    @classmethod
+    def ensure_default(cls):
+        """Create a first competition if there is none (``init_db``, benchmarks)."""
+        if db.session.execute(db.select(cls.id).limit(1)).first() is None:
+            cls.create('Wettbewerb', 'default')
+            db.session.commit()
+
+
+def current_competition_id():
+    """Competition the current request or CLI command works on.
+
+    Set per request in ``g.competition_id`` (URL slug or the operator's
+    choice, see ``app/routes.py``); falls back to the default competition.
+    """
+    cid = g.get('competition_id')
+    if cid is None:
+        cid = g.competition_id = Competition.default_id()
+    return cid
+
+
+# Rounds of the event and the participant column caching each round's top time
+ROUNDS = {
+    'VR': 'toptime_Vorrunde',
+    'ZR': 'toptime_Zwischenrunde',
+    'FINAL': 'toptime_Finalrunde',
+}
+# Time fields of the operator grid, the JSON API and the exports -> (round, attempt)
+# in the run table; more attempts or rounds only need an entry here.
+TIME_SLOTS = {
+    'time1': ('VR', 1),
+    'time2': ('VR', 2),
+    'time3': ('VR', 3),
+    'time4': ('ZR', 1),
+    'time5': ('ZR', 2),
+    'time6': ('FINAL', 1),
+}
+TIME_FIELDS = tuple(TIME_SLOTS)
+# Qualification flags every participant has while the prelim rounds are hidden
+HIDDEN_PRELIM_FLAGS = ('round1_qualified', 'round2_qualified', 'round3_qualified', 'zwischenrunde_qualified')
+
 
 class Participant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    active = db.Column(db.Boolean, default=False)
-    start_nr = db.Column(db.Integer, nullable=True, unique=True)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False)
+    start_nr = db.Column(db.Integer, nullable=True)
     first_name = db.Column(db.String(64), nullable=False)
     last_name = db.Column(db.String(64), nullable=False)
     address = db.Column(db.String(128), nullable=False)
@@ -32,45 +218,373 @@ class Participant(db.Model):
     email = db.Column(db.String(120), nullable=True)
     phone = db.Column(db.String(20), nullable=True)
     photo = db.Column(db.String(256), nullable=True)
-    time1 = db.Column(db.Float, nullable=True)
-    time2 = db.Column(db.Float, nullable=True)
-    time3 = db.Column(db.Float, nullable=True)
-    time4 = db.Column(db.Float, nullable=True)
-    time5 = db.Column(db.Float, nullable=True)
-    time6 = db.Column(db.Float, nullable=True)
     round1_qualified = db.Column(db.Boolean, default=False)
     round2_qualified = db.Column(db.Boolean, default=False)
     round3_qualified = db.Column(db.Boolean, default=False)
     zwischenrunde_qualified = db.Column(db.Boolean, default=False)
     final_qualified = db.Column(db.Boolean, default=False)
 
-    @property
-    def toptime_Vorrunde(self):
-        times = [t for t in [self.time1, self.time2, self.time3] if t is not None]
-        return max(times) if times else None
+    # Best run per round, derived from the run table by refresh_toptimes()
+    toptime_Vorrunde = db.Column(db.Float, nullable=True)
+    toptime_Zwischenrunde = db.Column(db.Float, nullable=True)
+    toptime_Finalrunde = db.Column(db.Float, nullable=True)
+
+    runs = db.relationship('Run', cascade='all, delete-orphan')
+
+    __table_args__ = (db.UniqueConstraint('competition_id', 'start_nr', name='uq_participant_start_nr'),)
+
+    @classmethod
+    def in_competition(cls):
+        """Criterion limiting a query to the current competition."""
+        return cls.competition_id == current_competition_id()
+
+    @classmethod
+    def scoped(cls):
+        """``Participant.query`` limited to the current competition."""
+        return cls.query.filter(cls.in_competition())
+
+    @classmethod
+    def initial_flags(cls, hide_prelim_rounds):
+        """Qualification flags of a new participant (form, import)."""
+        flags = dict.fromkeys(HIDDEN_PRELIM_FLAGS + ('final_qualified',), False)
+        if hide_prelim_rounds:
+            flags.update(dict.fromkeys(HIDDEN_PRELIM_FLAGS, True))
+        return flags
+
+    @classmethod
+    def toptimes_update(cls):
+        """UPDATE setting the top times from ``run``; callers add the WHERE clause."""
+        values = {
+            getattr(cls, column): db.select(db.func.max(Run.time))
+            .where(Run.participant_id == cls.id, Run.round == round_name)
+            .scalar_subquery()
+            for round_name, column in ROUNDS.items()
+        }
+        return db.update(cls).values(values)
+
+    @classmethod
+    def refresh_toptimes(cls, ids=None):
+        """Recompute the stored top times of ``ids`` (default: the competition) with one UPDATE."""
+        query = cls.toptimes_update()
+        if ids is not None:
+            query = query.where(cls.id.in_(list(ids)))
+        else:
+            query = query.where(cls.in_competition())
+        db.session.execute(query, execution_options={'synchronize_session': False})
+
+    @classmethod
+    def ranking_order(cls):
+        """ORDER BY clause for the ranking: Top Final -> Top ZR -> Top VR, missing times last."""
+        return (
+            cls.toptime_Finalrunde.desc().nulls_last(),
+            cls.toptime_Zwischenrunde.desc().nulls_last(),
+            cls.toptime_Vorrunde.desc().nulls_last(),
+            cls.id,
+        )
+
+    @classmethod
+    def with_times(cls, *columns):
+        """SELECT of ``columns`` (default: all) plus ``time1``..``time6`` from the run table.
 
-    @property
-    def toptime_Zwischenrunde(self):
-        times = [t for t in [self.time4, self.time5] if t is not None]
-        return max(times) if times else None
+        Rows behave like participants in templates; each time is a primary
+        key lookup in ``run``, so no participant needs to be loaded as object.
+        """
+        columns = columns or tuple(cls.__table__.columns)
+        return db.select(*columns, *Run.time_columns()).where(cls.in_competition())
 
-    @property
-    def toptime_Finalrunde(self):
-        times = [t for t in [self.time6] if t is not None]
-        return max(times) if times else None
+    @classmethod
+    def ranked(cls, *columns):
+        return cls.with_times(*columns).order_by(*cls.ranking_order())
+
+    @classmethod
+    def active_row(cls):
+        """The active participant with times, or None (primary key lookups only)."""
+        return db.session.execute(
+            cls.with_times().where(cls.id == LiveState.pointer())
+        ).first()
+
+    @classmethod
+    def is_active(cls):
+        """Boolean column expression: row is the active participant (operator grid)."""
+        return db.func.coalesce(cls.id == LiveState.pointer(), False).label('active')
+
+    @classmethod
+    def ranks_for(cls, ids):
+        """Map participant id -> 1-based position in the ranking for ``ids``."""
+        rank = db.func.row_number().over(order_by=cls.ranking_order()).label('rank')
+        ranking = db.select(cls.id, rank).where(cls.in_competition()).subquery()
+        rows = db.session.execute(
+            db.select(ranking.c.id, ranking.c.rank).where(ranking.c.id.in_(list(ids)))
+        )
+        return dict(rows.all())
 
 
+class Run(db.Model):
+    """One timed attempt of a participant in a round."""
+    __tablename__ = 'run'
+
+    participant_id = db.Column(
+        db.Integer, db.ForeignKey('participant.id', ondelete='CASCADE'), primary_key=True
+    )
+    round = db.Column(db.String(16), primary_key=True)
+    attempt = db.Column(db.Integer, primary_key=True)
+    time = db.Column(db.Float, nullable=False)
+    # The participant's competition, copied so per-competition scans need no join
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False)
+
+    @classmethod
+    def time_of(cls, round_name, attempt):
+        """Correlated subquery: the time of one attempt of the enclosing query's participant."""
+        return db.select(cls.time).where(
+            cls.participant_id == Participant.id,
+            cls.round == round_name,
+            cls.attempt == attempt,
+        ).scalar_subquery()
+
+    @classmethod
+    def time_columns(cls, fields=TIME_FIELDS):
+        return [cls.time_of(*TIME_SLOTS[name]).label(name) for name in fields]
+
+    @classmethod
+    def times_for(cls, ids):
+        """Map participant id -> ``{time field: value}`` of the recorded runs, one SELECT."""
+        fields = {slot: name for name, slot in TIME_SLOTS.items()}
+        times = {}
+        rows = db.session.execute(
+            db.select(cls.participant_id, cls.round, cls.attempt, cls.time)
+            .where(cls.participant_id.in_(list(ids)))
+        )
+        for pid, round_name, attempt, value in rows:
+            name = fields.get((round_name, attempt))
+            if name is not None:
+                times.setdefault(pid, {})[name] = value
+        return times
+
+
+class LiveState(db.Model):
+    """Show state of a competition: which participant is on the bull right now.
+
+    One row per competition, so switching riders is a single-row UPDATE and
+    reading the active rider a primary key lookup, independent of the size
+    of the field.
+    """
+    __tablename__ = 'live_state'
+
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), primary_key=True)
+    participant_id = db.Column(
+        db.Integer, db.ForeignKey('participant.id', ondelete='SET NULL'), nullable=True
+    )
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @classmethod
+    def pointer(cls):
+        """Scalar subquery: id of the current competition's active participant."""
+        return db.select(cls.participant_id).where(
+            cls.competition_id == current_competition_id()
+        ).scalar_subquery()
+
+    @classmethod
+    def active_id(cls):
+        return db.session.execute(db.select(cls.pointer())).scalar()
+
+    @classmethod
+    def set_active(cls, participant_id):
+        """Point the current competition at ``participant_id`` (None: nobody) in one write."""
+        cid = current_competition_id()
+        values = {'participant_id': participant_id, 'changed_at': datetime.utcnow()}
+        updated = db.session.execute(
+            db.update(cls).where(cls.competition_id == cid).values(values),
+            execution_options={'synchronize_session': False},
+        ).rowcount
+        if not updated:
+            db.session.execute(db.insert(cls).values(competition_id=cid, **values))
+
+    @classmethod
+    def clear(cls, participant_ids=None):
+        """Unset the pointer if it refers to one of ``participant_ids`` (default: any).
+
+        SQLite does not enforce ``ON DELETE SET NULL`` without the
+        ``foreign_keys`` pragma, so deletes call this explicitly.
+        """
+        query = db.update(cls).where(
+            cls.competition_id == current_competition_id(), cls.participant_id.isnot(None)
+        )
+        if participant_ids is not None:
+            query = query.where(cls.participant_id.in_(list(participant_ids)))
+        db.session.execute(
+            query.values(participant_id=None, changed_at=datetime.utcnow()),
+            execution_options={'synchronize_session': False},
+        )
+
+
+class ResultEvent(db.Model):
+    """Append-only journal entry: one time cell changed from ``old_time`` to ``new_time``.
+
+    Written in the same transaction as the change (see ``app/journal.py``);
+    ``None`` stands for "no time". Participants and users are referenced by
+    id only, so the history survives their deletion.
+    """
+    __tablename__ = 'result_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    competition_id = db.Column(db.Integer, nullable=False)
+    participant_id = db.Column(db.Integer, nullable=False)
+    round = db.Column(db.String(16), nullable=False)
+    attempt = db.Column(db.Integer, nullable=False)
+    old_time = db.Column(db.Float, nullable=True)
+    new_time = db.Column(db.Float, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class JournalCursor(db.Model):
+    """Last ``ResultEvent.id`` a journal consumer has applied."""
+    __tablename__ = 'journal_cursor'
+
+    name = db.Column(db.String(32), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Qualification per round reads the best runs of a competition as an index range scan
+db.Index('ix_run_competition_round_time', Run.competition_id, Run.round, Run.time.desc())
+
+# A rider's history within a competition
+db.Index('ix_result_event_competition_participant', ResultEvent.competition_id, ResultEvent.participant_id)
+
+# Matches Participant.ranking_order() within a competition, read as an index scan
+db.Index(
+    'ix_participant_ranking',
+    Participant.competition_id,
+    Participant.toptime_Finalrunde.desc(),
+    Participant.toptime_Zwischenrunde.desc(),
+    Participant.toptime_Vorrunde.desc(),
+    Participant.id,
+)
+
 class SiteSettings(db.Model):
     __tablename__ = 'site_settings'
 
     id = db.Column(db.Integer, primary_key=True)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False, unique=True)
     hide_prelim_rounds = db.Column(db.Boolean, nullable=False, default=False)
+    # Qualification rules used by finish_round (see app/qualification.py)
+    prelim_threshold = db.Column(db.Float, nullable=False, default=99.0)
+    prelim_min_qualified = db.Column(db.Integer, nullable=False, default=5)
+    intermediate_top_n = db.Column(db.Integer, nullable=False, default=10)
+
+    # Per-process snapshots: competition id -> (settings stamp, SimpleNamespace of column values)
+    _cache = {}
 
     @classmethod
     def get_settings(cls):
-        settings = cls.query.first()
+        """Read-only settings snapshot of the current competition, cached per process.
+
+        The cache is checked against ``DataVersion.settings_stamp()`` so a save
+        in one gunicorn worker is seen by the others on their next request.
+        Never writes; if the row is missing the column defaults are returned.
+        Use ``load()`` to get the row for editing.
+        """
+        cid = current_competition_id()
+        stamp = DataVersion.settings_stamp()
+        cached = cls._cache.get(cid)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        row = cls.query.filter_by(competition_id=cid).first()
+        values = {
+            column.name: getattr(row, column.name) if row is not None else column.default.arg
+            for column in cls.__table__.columns
+            if column.name not in ('id', 'competition_id')
+        }
+        snapshot = SimpleNamespace(**values)
+        cls._cache[cid] = (stamp, snapshot)
+        return snapshot
+
+    @classmethod
+    def load(cls):
+        """The settings row for editing, created with defaults if missing."""
+        cid = current_competition_id()
+        settings = cls.query.filter_by(competition_id=cid).first()
         if settings is None:
-            settings = cls()
+            settings = cls(competition_id=cid)
             db.session.add(settings)
-            db.session.commit()
         return settings
+
+    @classmethod
+    def ensure_default(cls):
+        """Create the first competition and its settings row at startup (``init_db``)."""
+        Competition.ensure_default()
+
+
+class DataVersion(db.Model):
+    """Per-competition counters bumped by writes; the row id is the competition id.
+
+    ``version`` moves on every write that changes public data, and
+    ``settings_version`` only when ``SiteSettings`` are saved. ``users_version``
+    is global (equal in all rows) and moves when a user changes, which
+    invalidates the identities cached by ``load_user``. Stored in the
+    database so all gunicorn workers agree on them; read paths use them to
+    answer conditional requests and validate caches without touching
+    ``participant``. Both are read with one query and memoized per app context.
+    Writes to one competition leave the caches of the others valid.
+    """
+    __tablename__ = 'data_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    settings_version = db.Column(db.Integer, nullable=False, default=1)
+    users_version = db.Column(db.Integer, nullable=False, default=1)
+
+    @classmethod
+    def _stamps(cls):
+        cid = current_competition_id()
+        memo = g.get('_data_version_stamps')
+        if memo is None or memo[0] != cid:
+            row = db.session.execute(
+                db.select(cls.version, cls.settings_version, cls.users_version).where(cls.id == cid)
+            ).first()
+            memo = g._data_version_stamps = (cid, tuple(row) if row is not None else (0, 0, 0))
+        return memo[1]
+
+    @classmethod
+    def current(cls):
+        return cls._stamps()[0]
+
+    @classmethod
+    def settings_stamp(cls):
+        return cls._stamps()[1]
+
+    @classmethod
+    def users_stamp(cls):
+        # Same value in every row, so any competition's memoized stamps will do
+        memo = g.get('_data_version_stamps')
+        return memo[1][2] if memo is not None else cls._stamps()[2]
+
+    @classmethod
+    def users_max(cls):
+        return db.select(db.func.coalesce(db.func.max(cls.users_version), 1)).scalar_subquery()
+
+    @classmethod
+    def bump_users(cls):
+        """Move ``users_version`` past its maximum in every row (caller's transaction)."""
+        g.pop('_data_version_stamps', None)
+        db.session.execute(
+            db.update(cls).values(users_version=cls.users_max() + 1),
+            execution_options={'synchronize_session': False},
+        )
+
+    @classmethod
+    def bump(cls, settings=False):
+        """Increment the current competition's version inside the caller's transaction.
+
+        Pass ``settings=True`` when ``SiteSettings`` changed as well.
+        """
+        cid = current_competition_id()
+        g.pop('_data_version_stamps', None)
+        values = {'version': cls.version + 1}
+        if settings:
+            values['settings_version'] = cls.settings_version + 1
+        result = db.session.execute(
+            db.update(cls).where(cls.id == cid).values(values)
+        )
+        if result.rowcount == 0:
+            db.session.add(cls(id=cid, version=1, settings_version=1, users_version=cls.users_max()))
@@ -0,0 +1,154 @@
+"""Set-based qualification rules for closing a round (``finish_round``).
+
+Each round is described by a ``RoundRule``; ``apply_rule`` turns it into a
+handful of UPDATE statements so closing a round never loads a participant
+object, however large the field is. Every statement is limited to the
+current competition.
+"""
+from dataclasses import dataclass
+
+from app import db
+from app.models import Participant, Run, ROUNDS, current_competition_id
+
+
+@dataclass(frozen=True)
+class RoundRule:
+    """How one round decides who qualifies.
+
+    The riders are ranked by their time in ``round``: the given ``attempt``
+    from the run table, or with ``attempt=None`` the round's top time. ``flag``
+    marks who already qualified and
+    ``sets`` lists the flags set for every qualifier. Riders reaching
+    ``threshold`` qualify directly; afterwards the best not-yet-qualified riders
+    are added until ``min_qualified`` is reached. With ``top_n`` exactly the
+    best N riders get ``flag`` and everyone else loses it; with
+    ``qualify_all`` every rider qualifies.
+    """
+    round: str
+    attempt: int
+    flag: str
+    sets: tuple
+    threshold: float = None
+    min_qualified: int = 0
+    top_n: int = None
+    reset: bool = False
+    qualify_all: bool = False
+
+
+def rules_for(settings):
+    """Build the round rules using the event's thresholds from ``SiteSettings``."""
+    threshold = settings.prelim_threshold
+    min_qualified = settings.prelim_min_qualified
+    return {
+        'VR1': RoundRule(
+            round='VR',
+            attempt=1,
+            flag='round1_qualified',
+            sets=('round1_qualified', 'round2_qualified', 'round3_qualified'),
+            threshold=threshold,
+            min_qualified=min_qualified,
+            reset=True,
+        ),
+        'VR2': RoundRule(
+            round='VR',
+            attempt=2,
+            flag='round2_qualified',
+            sets=('round2_qualified', 'round3_qualified'),
+            threshold=threshold,
+            min_qualified=min_qualified,
+        ),
+        'VR3': RoundRule(
+            round='VR',
+            attempt=3,
+            flag='round3_qualified',
+            sets=('round3_qualified',),
+            threshold=threshold,
+            min_qualified=min_qualified,
+        ),
+        'ZR': RoundRule(
+            round='ZR',
+            attempt=None,
+            flag='zwischenrunde_qualified',
+            sets=('zwischenrunde_qualified',),
+            top_n=settings.intermediate_top_n,
+        ),
+        'FINAL': RoundRule(
+            round='FINAL',
+            attempt=1,
+            flag='final_qualified',
+            sets=('final_qualified',),
+            qualify_all=True,
+        ),
+    }
+
+
+def _time(rule):
+    """The time ``rule`` ranks by, as a column expression on ``participant``."""
+    if rule.attempt is None:
+        return getattr(Participant, ROUNDS[rule.round])
+    return Run.time_of(rule.round, rule.attempt)
+
+
+def _reaching(rule, threshold):
+    """Criterion for riders whose time for ``rule`` is at least ``threshold``."""
+    if rule.attempt is None:
+        return _time(rule) >= threshold
+    # Range scan on ix_run_competition_round_time instead of a lookup per rider
+    return Participant.id.in_(
+        db.select(Run.participant_id).where(
+            Run.competition_id == current_competition_id(),
+            Run.round == rule.round, Run.attempt == rule.attempt, Run.time >= threshold,
+        )
+    )
+
+
+def _best_ids(rule, limit, only_unqualified=False):
+    """Subquery selecting the ids of the best ``limit`` riders for ``rule``."""
+    time = _time(rule)
+    query = db.select(Participant.id).where(Participant.in_competition())
+    if only_unqualified:
+        query = query.where(getattr(Participant, rule.flag).isnot(True))
+    # Riders without a time rank last; ties keep registration order
+    return query.order_by(time.desc().nulls_last(), Participant.id).limit(limit)
+
+
+def _set_flags(rule, *criteria):
+    values = {getattr(Participant, name): True for name in rule.sets}
+    result = db.session.execute(
+        db.update(Participant).where(Participant.in_competition(), *criteria).values(values),
+        execution_options={'synchronize_session': False},
+    )
+    return result.rowcount
+
+
+def apply_rule(rule):
+    """Apply ``rule`` inside the current transaction (caller commits)."""
+    flag = getattr(Participant, rule.flag)
+
+    if rule.qualify_all:
+        _set_flags(rule)
+        return
+
+    if rule.top_n is not None:
+        db.session.execute(
+            db.update(Participant).where(Participant.in_competition()).values({
+                flag: Participant.id.in_(_best_ids(rule, rule.top_n).scalar_subquery())
+            }),
+            execution_options={'synchronize_session': False},
+        )
+        return
+
+    if rule.reset:
+        db.session.execute(
+            db.update(Participant).where(Participant.in_competition()).values({flag: False}),
+            execution_options={'synchronize_session': False},
+        )
+
+    qualified = 0
+    if rule.threshold is not None:
+        qualified = _set_flags(rule, _reaching(rule, rule.threshold))
+
+    missing = rule.min_qualified - qualified
+    if missing > 0:
+        best = _best_ids(rule, missing, only_unqualified=True).scalar_subquery()
+        _set_flags(rule, Participant.id.in_(best))
@@ -0,0 +1,242 @@
+"""Time entry: validate time changes and write only what actually changed.
+
+Times live in the ``run`` table, one row per recorded attempt; clearing a
+time deletes its row. Every change is journaled with its old value in the
+same transaction, and the journal consumers then update the stored top
+times of the participants concerned (``app/journal.py``).
+"""
+import math
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db, journal
+from app.models import Participant, Run, TIME_FIELDS, TIME_SLOTS, current_competition_id
+
+
+class TimeChangeError(ValueError):
+    """Raised for a malformed or invalid time change; the message is user-facing."""
+
+
+class TimeConflictError(Exception):
+    """The cell no longer holds the value the client based its edit on."""
+
+    def __init__(self, current):
+        super().__init__('Die Zeit wurde inzwischen von jemand anderem geändert.')
+        self.current = current
+
+
+_UNSET = object()
+
+
+def parse_time_value(value):
+    """Convert a submitted time to float; empty values clear the time."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise TimeChangeError('Ungültige Zeit.')
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        text = str(value).strip().replace(',', '.')
+        if not text:
+            return None
+        try:
+            number = float(text)
+        except ValueError:
+            raise TimeChangeError(f'Ungültige Zeit: {value!r}.')
+    if not math.isfinite(number) or number < 0:
+        raise TimeChangeError(f'Ungültige Zeit: {value!r}.')
+    return number
+
+
+def parse_changes(items):
+    """Validate a list of ``{id, field, value}`` items.
+
+    Returns ``{participant_id: {field: value}}``; later items win when the
+    same cell appears twice.
+    """
+    if not isinstance(items, list):
+        raise TimeChangeError('Erwartet eine Liste von Änderungen.')
+    changes = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise TimeChangeError(f'Änderung {index}: Objekt erwartet.')
+        pid = item.get('id')
+        try:
+            if isinstance(pid, bool):
+                raise TypeError
+            pid = int(pid)
+        except (TypeError, ValueError):
+            raise TimeChangeError(f'Änderung {index}: ungültige Teilnehmer-ID.')
+        field = item.get('field')
+        if field not in TIME_FIELDS:
+            raise TimeChangeError(f'Änderung {index}: unbekanntes Feld {field!r}.')
+        try:
+            value = parse_time_value(item.get('value'))
+        except TimeChangeError as exc:
+            raise TimeChangeError(f'Änderung {index}: {exc}')
+        changes.setdefault(pid, {})[field] = value
+    return changes
+
+
+def apply_time_changes(changes):
+    """Apply ``{participant_id: {field: value}}`` in the current transaction.
+
+    Current runs are read with one SELECT and unchanged cells are dropped;
+    the rest is written with at most one executemany each for new, changed
+    and cleared runs, one for the journal, and the journal catch-up.
+    Every write is guarded by the value just read; if another request
+    changed one of the cells in between, ``TimeConflictError`` is raised and
+    the caller rolls back. Returns the list of participant ids that actually
+    changed.
+    """
+    if not changes:
+        return []
+    known = set(db.session.scalars(
+        db.select(Participant.id).where(Participant.in_competition(), Participant.id.in_(list(changes)))
+    ))
+    missing = sorted(set(changes) - known)
+    if missing:
+        raise TimeChangeError(f"Unbekannte Teilnehmer: {', '.join(map(str, missing))}.")
+
+    current = Run.times_for(changes)
+    competition_id = current_competition_id()
+    inserts, updates, deletes, events = [], [], [], []
+    changed = []
+    for pid, fields in changes.items():
+        before = current.get(pid, {})
+        row_changed = False
+        for field, value in fields.items():
+            old = before.get(field)
+            if old == value:
+                continue
+            round_name, attempt = TIME_SLOTS[field]
+            key = {'participant_id': pid, 'round': round_name, 'attempt': attempt}
+            events.append({**key, 'old_time': old, 'new_time': value})
+            if old is None:
+                inserts.append({**key, 'time': value, 'competition_id': competition_id})
+            else:
+                guard = {'b_pid': pid, 'b_round': round_name, 'b_attempt': attempt, 'b_old': old}
+                if value is None:
+                    deletes.append(guard)
+                else:
+                    updates.append({**guard, 'b_time': value})
+            row_changed = True
+        if row_changed:
+            changed.append(pid)
+    run = Run.__table__
+    guarded = (
+        run.c.participant_id == db.bindparam('b_pid'),
+        run.c.round == db.bindparam('b_round'),
+        run.c.attempt == db.bindparam('b_attempt'),
+        run.c.time == db.bindparam('b_old'),
+    )
+    _write_all(db.delete(run).where(*guarded), deletes)
+    _write_all(db.update(run).where(*guarded).values(time=db.bindparam('b_time')), updates)
+    _write_all(_insert_run(), inserts)
+    if changed:
+        journal.record(events)
+        journal.catch_up()
+    return changed
+
+
+def summarize(ids):
+    """Top times and ranking position for ``ids``, as sent back to the grid."""
+    ids = list(ids)
+    if not ids:
+        return []
+    ranks = Participant.ranks_for(ids)
+    rows = db.session.execute(
+        db.select(
+            Participant.id,
+            Participant.toptime_Vorrunde,
+            Participant.toptime_Zwischenrunde,
+            Participant.toptime_Finalrunde,
+        ).where(Participant.in_competition(), Participant.id.in_(ids))
+    ).all()
+    return [
+        {
+            'id': row.id,
+            'toptime_Vorrunde': row.toptime_Vorrunde,
+            'toptime_Zwischenrunde': row.toptime_Zwischenrunde,
+            'toptime_Finalrunde': row.toptime_Finalrunde,
+            'rank': ranks.get(row.id),
+        }
+        for row in rows
+    ]
+
+
+def _insert_run():
+    """``INSERT ... ON CONFLICT DO NOTHING`` into ``run``: a lost race shows in the rowcount.
+
+    Replaces a SAVEPOINT around a plain INSERT: pysqlite only emits BEGIN
+    before DML, so a savepoint opened after mere SELECTs was the outermost
+    transaction and its RELEASE committed the insert.
+    """
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(Run.__table__).on_conflict_do_nothing()
+
+
+def _write_all(query, params):
+    """One executemany of guarded writes; ``TimeConflictError`` unless every row matched."""
+    if params and db.session.execute(query, params).rowcount != len(params):
+        raise TimeConflictError(None)
+
+
+def _insert_run_if_absent(**values):
+    """Insert one run unless the attempt is already recorded; True if it was inserted."""
+    return db.session.execute(_insert_run().values(**values)).rowcount == 1
+
+
+def _write_time(pid, round_name, attempt, old, value):
+    """Write one cell if it still holds ``old``; returns False if it did not."""
+    key = (Run.participant_id == pid, Run.round == round_name, Run.attempt == attempt)
+    if old is None:
+        # False if someone recorded this attempt in the meantime
+        return _insert_run_if_absent(
+            participant_id=pid, round=round_name, attempt=attempt, time=value,
+            competition_id=current_competition_id(),
+        )
+    if value is None:
+        query = db.delete(Run).where(*key, Run.time == old)
+    else:
+        query = db.update(Run).where(*key, Run.time == old).values(time=value)
+    result = db.session.execute(query, execution_options={'synchronize_session': False})
+    return result.rowcount == 1
+
+
+def set_time(pid, field, value, expected=_UNSET, attempts=3):
+    """Compare-and-set a single time cell; returns True if the cell changed.
+
+    ``expected`` is the value the client saw. If the cell holds something
+    else, ``TimeConflictError`` is raised so a second judge cannot silently
+    overwrite a result. The write is guarded by the value just read and
+    retried if it lost a race; top times are recomputed from ``run`` by the
+    journal catch-up, so concurrent edits of other cells never leave them stale.
+    """
+    if field not in TIME_FIELDS:
+        raise TimeChangeError(f'Unbekanntes Feld {field!r}.')
+    round_name, attempt = TIME_SLOTS[field]
+    exists = db.session.execute(
+        db.select(Participant.id).where(Participant.in_competition(), Participant.id == pid)
+    ).first()
+    if exists is None:
+        raise TimeChangeError(f'Unbekannter Teilnehmer: {pid}.')
+    for _ in range(attempts):
+        current = db.session.execute(
+            db.select(Run.time).where(
+                Run.participant_id == pid, Run.round == round_name, Run.attempt == attempt,
+            )
+        ).scalar()
+        if expected is not _UNSET and current != expected:
+            raise TimeConflictError(current)
+        if current == value:
+            return False
+        if _write_time(pid, round_name, attempt, current, value):
+            journal.record([{
+                'participant_id': pid, 'round': round_name, 'attempt': attempt,
+                'old_time': current, 'new_time': value,
+            }])
+            journal.catch_up()
+            return True
+    raise TimeConflictError(None)
@@ -1,103 +1,161 @@
-from flask import render_template, flash, redirect, url_for, request, Blueprint, jsonify
+from flask import render_template, flash, redirect, url_for, request, Blueprint, jsonify, Response, abort, stream_with_context, g, session
 from flask_login import current_user, login_user, logout_user, login_required
+from sqlalchemy.exc import IntegrityError
 
-from app import db
-from app.models import User, Participant, SiteSettings
-from app.forms import LoginForm, RegistrationForm, ParticipantForm, ChangePasswordForm, AdminSettingsForm
-from werkzeug.utils import secure_filename
-import os
+from app import db, active_hub, tasks, fragment_cache, request_timing
+from app.models import User, Competition, Participant, Run, LiveState, SiteSettings, DataVersion, TIME_FIELDS, HIDDEN_PRELIM_FLAGS, invalidate_user, current_competition_id
+from app.caching import conditional_on_data_version, micro_cached
+from app import qualification, results, images, exports, imports, archive, journal
+from app.forms import LoginForm, RegistrationForm, ParticipantForm, ChangePasswordForm, AdminSettingsForm, ParticipantImportForm, CompetitionForm
 from flask import current_app
+from datetime import date
+import os
 
 bp = Blueprint('main', __name__)
 
-
-def _apply_hide_prelim_flags(participant):
-    """Ensure a participant is fully qualified when prelim rounds are hidden."""
-    changed = False
-    if not participant.round1_qualified:
-        participant.round1_qualified = True
-        changed = True
-    if not participant.round2_qualified:
-        participant.round2_qualified = True
-        changed = True
-    if not participant.round3_qualified:
-        participant.round3_qualified = True
-        changed = True
-    if not participant.zwischenrunde_qualified:
-        participant.zwischenrunde_qualified = True
-        changed = True
-    return changed
-
-
-def _ensure_hide_prelim_alignment(settings, participants=None):
-    """Apply hide-prelim-round rules to all given participants when required."""
+# Columns the ranking and the operator grid show; contact data is never loaded there
+# (the grid adds Participant.is_active(), which depends on the request's competition)
+RANKING_COLUMNS = (
+    Participant.id, Participant.start_nr, Participant.first_name, Participant.last_name,
+    Participant.toptime_Vorrunde, Participant.toptime_Zwischenrunde, Participant.toptime_Finalrunde,
+)
+GRID_COLUMNS = RANKING_COLUMNS + (
+    Participant.round1_qualified, Participant.round2_qualified,
+    Participant.round3_qualified, Participant.zwischenrunde_qualified, Participant.final_qualified,
+)
+
+
+@bp.url_value_preprocessor
+def pull_competition(endpoint, values):
+    """``/c/<slug>/...`` URLs select their competition; unknown slugs are 404."""
+    slug = values.pop('competition', None) if values else None
+    if slug is None:
+        return
+    cid = Competition.id_for_slug(slug)
+    if cid is None:
+        abort(404)
+    g.competition_id = cid
+    g.competition_slug = slug
+
+
+@bp.before_request
+def select_competition():
+    # Without a slug in the URL operators work on the competition they picked
+    if g.get('competition_id') is None and current_user.is_authenticated:
+        cid = session.get('competition_id')
+        if cid is not None and Competition.slug_for_id(cid) is not None:
+            g.competition_id = cid
+
+
+@bp.url_defaults
+def add_competition(endpoint, values):
+    # Links rendered on a /c/<slug>/ page stay within that competition
+    slug = g.get('competition_slug')
+    if slug and 'competition' not in values and current_app.url_map.is_endpoint_expecting(endpoint, 'competition'):
+        values['competition'] = slug
+
+
+def _align_hide_prelim_flags(settings):
+    """Apply the hide-prelim-round rule to all participants in one UPDATE.
+
+    Runs on writes only (settings change, new participants, round resets) so
+    read paths never have to touch the participant table for it.
+    """
     if not settings.hide_prelim_rounds:
-        return False
-    if participants is None:
-        participants = Participant.query.all()
-    changed = False
-    for participant in participants:
-        if _apply_hide_prelim_flags(participant):
-            changed = True
-    return changed
+        return
+    columns = [getattr(Participant, name) for name in HIDDEN_PRELIM_FLAGS]
+    Participant.scoped().filter(db.or_(*(column.isnot(True) for column in columns))).update(
+        dict.fromkeys(columns, True), synchronize_session=False,
+    )
 
-@bp.route('/')
-@bp.route('/index')
-def index():
+def _clear_runs(participant_ids):
+    """Journal and delete all runs of ``participant_ids`` (a SELECT of ids)."""
+    journal.record_clear(participant_ids)
+    db.session.execute(db.delete(Run).where(Run.participant_id.in_(participant_ids)))
+    journal.catch_up()
 
-    participants = Participant.query.all()
-    participants.sort(key=lambda p: (
-            p.toptime_Finalrunde if p.toptime_Finalrunde is not None else float('-inf'),
-            p.toptime_Zwischenrunde if p.toptime_Zwischenrunde is not None else float('-inf'),
-            p.toptime_Vorrunde if p.toptime_Vorrunde is not None else float('-inf')
-    ), reverse=True)
+def _ranking_rows(settings):
+    """Rendered ranking table rows, shared by all requests until the next write."""
+    hide_vr = bool(settings.hide_prelim_rounds)
+    theme = request.cookies.get('theme')
+    key = (current_competition_id(), DataVersion.current(), int(hide_vr), theme if theme in ('dark', 'light') else '')
 
-    if not participants:
-        flash('Keine Teilnehmer gefunden')
-        form = ParticipantForm()
-        return render_template('participant.html', title='Teilnehmer hinzufügen', form=form)
+    def render():
+        rankings = db.session.execute(Participant.ranked(*RANKING_COLUMNS)).all()
+        return render_template('_ranking_rows.html', rankings=rankings, hide_vr=hide_vr).strip()
 
-    if not current_user.is_authenticated:
-        settings = SiteSettings.get_settings()
-        if _ensure_hide_prelim_alignment(settings, participants):
-            db.session.commit()
-        return render_template('ranking.html', title='Rangliste', rankings=participants, hide_prelim_rounds=settings.hide_prelim_rounds)
+    return fragment_cache.get_or_render('ranking-rows', key, render)
 
+
+@bp.route('/')
+@bp.route('/index')
+@conditional_on_data_version()
+def index():
     settings = SiteSettings.get_settings()
-    if _ensure_hide_prelim_alignment(settings, participants):
-        db.session.commit()
-    return render_template(
-        'index.html', 
-        title='Home', 
-        participants=participants,
-        hide_prelim_rounds=settings.hide_prelim_rounds,
-    )
+    if current_user.is_authenticated:
+        participants = db.session.execute(Participant.ranked(*GRID_COLUMNS, Participant.is_active())).all()
+        if participants:
+            return render_template(
+                'index.html', 
+                title='Home', 
+                participants=participants,
+                hide_prelim_rounds=settings.hide_prelim_rounds,
+            )
+    else:
+        ranking_rows = _ranking_rows(settings)
+        if ranking_rows:
+            return render_template('ranking.html', title='Rangliste', ranking_rows=ranking_rows, hide_prelim_rounds=settings.hide_prelim_rounds)
+
+    flash('Keine Teilnehmer gefunden')
+    form = ParticipantForm()
+    return render_template('participant.html', title='Teilnehmer hinzufügen', form=form)
 
 @bp.route('/active')
+@bp.route('/c/<competition>/active')
+@conditional_on_data_version()
+@micro_cached()
 def active():
-    participant = Participant.query.filter_by(active=True).first()
+    participant = Participant.active_row()
     settings = SiteSettings.get_settings()
-    if _ensure_hide_prelim_alignment(settings, [p for p in [participant] if p]):
-        db.session.commit()
     return render_template('active.html', title='Live', participant=participant, hide_prelim_rounds=settings.hide_prelim_rounds)
 
 @bp.route('/stage')
+@bp.route('/c/<competition>/stage')
 @login_required
 def stage():
-    participant = Participant.query.filter_by(active=True).first()
+    participant = Participant.active_row()
     settings = SiteSettings.get_settings()
-    if _ensure_hide_prelim_alignment(settings, [p for p in [participant] if p]):
-        db.session.commit()
     return render_template('stage.html', title='Stage', participant=participant, hide_prelim_rounds=settings.hide_prelim_rounds)
 
 @bp.route('/active_id')
+@bp.route('/c/<competition>/active_id')
+@conditional_on_data_version(anonymous_only=False)
+@micro_cached(anonymous_only=False)
 def active_id():
     """Lightweight endpoint to check the current active participant id.
     Used by the stage/live views to avoid full-page reloads unless needed.
     """
-    participant = Participant.query.filter_by(active=True).first()
-    pid = participant.id if participant else None
-    return jsonify({"id": pid})
+    return jsonify({"id": LiveState.active_id()})
+
+@bp.route('/events/active')
+@bp.route('/c/<competition>/events/active')
+def active_events():
+    """Server-Sent Events stream pushing the active participant on change.
+
+    Streams hold a worker thread each, so only ``SSE_MAX_STREAMS`` run per
+    process. Beyond that the answer is 204, which tells EventSource not to
+    reconnect; the page then polls ``/active_id`` instead.
+    """
+    if not active_hub.acquire_stream():
+        return Response(status=204, headers={'Cache-Control': 'no-store'})
+    response = Response(
+        active_hub.stream(current_competition_id(), request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Called by the server when the response ends, even if the stream never started
+    response.call_on_close(active_hub.release_stream)
+    return response
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -146,10 +204,13 @@ def register():
 def change_password():
     form = ChangePasswordForm()
     if form.validate_on_submit():
-        if not current_user.check_password(form.current_password.data):
+        # current_user is a cached identity without the hash; load the full row
+        user = db.session.get(User, current_user.id)
+        if not user.check_password(form.current_password.data):
             flash('Aktuelles Passwort ist falsch.', 'danger')
             return redirect(url_for('main.change_password'))
-        current_user.set_password(form.new_password.data)
+        user.set_password(form.new_password.data)
+        invalidate_user(user.id)
         db.session.commit()
         flash('Passwort erfolgreich geändert.', 'success')
         return redirect(url_for('main.index'))
@@ -159,21 +220,77 @@ def change_password():
 @bp.route('/admin/settings', methods=['GET', 'POST'])
 @login_required
 def admin_settings():
-    settings = SiteSettings.get_settings()
+    settings = SiteSettings.load()
     form = AdminSettingsForm(obj=settings)
     if form.validate_on_submit():
         settings.hide_prelim_rounds = form.hide_prelim_rounds.data
-        if _ensure_hide_prelim_alignment(settings):
-            db.session.flush()
+        settings.prelim_threshold = form.prelim_threshold.data
+        settings.prelim_min_qualified = form.prelim_min_qualified.data
+        settings.intermediate_top_n = form.intermediate_top_n.data
+        _align_hide_prelim_flags(settings)
+        DataVersion.bump(settings=True)
         db.session.commit()
         flash('Einstellungen gespeichert.', 'success')
         return redirect(url_for('main.admin_settings'))
     return render_template('admin_settings.html', title='Admin Einstellungen', form=form)
 
+@bp.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    """Status of recent background jobs in this worker process."""
+    return jsonify({'jobs': tasks.jobs()})
+
+@bp.route('/admin/cache')
+@login_required
+def admin_cache():
+    """Fragment cache hit/miss counters of this worker process."""
+    return jsonify(fragment_cache.stats())
+
+@bp.route('/admin/timing', methods=['GET', 'POST'])
+@login_required
+def admin_timing():
+    """Slowest endpoints of this worker process (``REQUEST_TIMING``)."""
+    if request.method == 'POST':
+        request_timing.reset()
+        flash('Messwerte zurückgesetzt.', 'success')
+        return redirect(url_for('main.admin_timing'))
+    stats = request_timing.stats()
+    if request.args.get('format') == 'json':
+        return jsonify(stats)
+    return render_template('admin_timing.html', title='Performance', stats=stats)
+
+@bp.route('/competitions', methods=['GET', 'POST'])
+@login_required
+def competitions():
+    """List the competitions and create new ones."""
+    form = CompetitionForm()
+    if form.validate_on_submit():
+        competition = Competition.create(form.name.data, form.slug.data)
+        db.session.commit()
+        session['competition_id'] = competition.id
+        flash(f'Wettbewerb {competition.name} erstellt und ausgewählt.', 'success')
+        return redirect(url_for('main.competitions'))
+    rows = db.session.execute(
+        db.select(Competition, db.func.count(Participant.id))
+        .outerjoin(Participant, Participant.competition_id == Competition.id)
+        .group_by(Competition.id)
+        .order_by(Competition.id)
+    ).all()
+    return render_template('competitions.html', title='Wettbewerbe', form=form,
+                           competitions=rows, current_id=current_competition_id())
+
+@bp.route('/competitions/<int:id>/select', methods=['POST'])
+@login_required
+def competition_select(id):
+    competition = db.get_or_404(Competition, id)
+    session['competition_id'] = competition.id
+    flash(f'Wettbewerb {competition.name} ausgewählt.', 'success')
+    return redirect(url_for('main.index'))
+
 @bp.route('/participants')
 @login_required
 def participant():
-    participants = Participant.query.all()
+    participants = Participant.scoped().all()
     show_thumbs = request.args.get('thumbs', default='1')
     try:
         show_thumbs = False if str(show_thumbs) in ('0', 'false', 'False') else True
@@ -186,50 +303,73 @@ def participant():
 def participant_add():
     form = ParticipantForm()
     if form.validate_on_submit():
-        participant = Participant()
+        participant = Participant(competition_id=current_competition_id())
         form.update_data(participant)
         # Handle photo upload
         file = form.photo.data
         if file:
-            filename = secure_filename(file.filename)
-            # avoid collisions
-            base, ext = os.path.splitext(filename)
-            safe_name = f"{base}_{str(id(participant))}{ext}"
-            upload_dir = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, safe_name)
-            file.save(file_path)
-            # store relative path under static
-            participant.photo = os.path.join('uploads', safe_name).replace('\\', '/')
-        settings = SiteSettings.get_settings()
-        _ensure_hide_prelim_alignment(settings, [participant])
+            # Stored under its content hash; identical uploads share one file
+            participant.photo = images.store_upload(file)
+        for name, value in Participant.initial_flags(SiteSettings.get_settings().hide_prelim_rounds).items():
+            setattr(participant, name, value)
         db.session.add(participant)
+        DataVersion.bump()
         db.session.commit()
+        if participant.photo:
+            # Resizing runs in the background; the original is served meanwhile
+            tasks.submit('photo-variants', images.generate_variants, participant.photo)
         flash('Participant added successfully!', 'success')
         return redirect(url_for('main.index'))
     return render_template('participant_add.html', title='Add Participant', form=form)
 
+@bp.route('/participants/import', methods=['GET', 'POST'])
+@login_required
+def participant_import():
+    form = ParticipantImportForm()
+    report = None
+    if form.validate_on_submit():
+        settings = SiteSettings.get_settings()
+        try:
+            report = imports.import_participants(
+                form.file.data.stream,
+                dry_run=form.dry_run.data,
+                skip_invalid=form.skip_invalid.data,
+                qualified=bool(settings.hide_prelim_rounds),
+            )
+        except imports.ImportFileError as exc:
+            db.session.rollback()
+            flash(str(exc), 'danger')
+            return render_template('participant_import.html', title='Teilnehmer importieren', form=form)
+        if report.imported:
+            DataVersion.bump()
+            db.session.commit()
+            flash(f'{report.imported} Teilnehmer importiert.', 'success')
+        else:
+            db.session.rollback()
+            if report.dry_run and report.ok:
+                flash(f'{report.valid} Zeilen geprüft, keine Fehler.', 'success')
+            elif report.errors:
+                flash(f'{len(report.errors)} Fehler gefunden, nichts importiert.', 'danger')
+    return render_template('participant_import.html', title='Teilnehmer importieren', form=form, report=report)
+
 @bp.route('/participant_edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 def participant_edit(id):
-    participant = Participant.query.get_or_404(id)
+    participant = Participant.scoped().filter_by(id=id).first_or_404()
     form = ParticipantForm(obj=participant)
     if form.validate_on_submit():
         form.update_data(participant)
+        old_photo = participant.photo
         # Handle new photo upload (optional)
         file = form.photo.data
         if file:
-            filename = secure_filename(file.filename)
-            base, ext = os.path.splitext(filename)
-            safe_name = f"{base}_{participant.id}{ext}"
-            upload_dir = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, safe_name)
-            file.save(file_path)
-            participant.photo = os.path.join('uploads', safe_name).replace('\\', '/')
-        settings = SiteSettings.get_settings()
-        _ensure_hide_prelim_alignment(settings, [participant])
+            participant.photo = images.store_upload(file)
+        DataVersion.bump()
         db.session.commit()
+        if file:
+            tasks.submit('photo-variants', images.generate_variants, participant.photo)
+            if old_photo and old_photo != participant.photo:
+                tasks.submit('photo-remove', images.release_photo, old_photo)
         flash('Participant updated successfully!', 'success')
         return redirect(url_for('main.index'))
     form.load_data(participant)
@@ -239,38 +379,47 @@ def participant_edit(id):
 @bp.route('/participant_delete/<int:id>', methods=['POST'])
 @login_required
 def participant_delete(id):
-    participant = Participant.query.get_or_404(id)
-    # Optionally remove photo file (ignore errors)
-    if participant.photo:
-        try:
-            os.remove(os.path.join(current_app.static_folder, participant.photo))
-        except Exception:
-            pass
+    participant = Participant.scoped().filter_by(id=id).first_or_404()
+    photo = participant.photo
+    LiveState.clear([participant.id])
+    _clear_runs(db.select(Participant.id).where(Participant.id == participant.id))
     db.session.delete(participant)
+    DataVersion.bump()
     db.session.commit()
+    # Remove the photo once unreferenced, then sweep older leftovers, off the request path
+    if photo:
+        tasks.submit('photo-remove', images.release_photo, photo)
+    tasks.submit('photo-cleanup', images.cleanup_orphan_photos)
     flash('Participant deleted successfully!', 'success')
     return redirect(url_for('main.index'))
 
 @bp.route('/update_times/<int:id>', methods=['POST'])
 @login_required
 def update_times(id):
-    participant = Participant.query.get_or_404(id)
+    participant = Participant.scoped().filter_by(id=id).first_or_404()
     
     if 'update_times' in request.form:
-        participant.time1 = request.form.get('time1', type=float)
-        participant.time2 = request.form.get('time2', type=float)
-        participant.time3 = request.form.get('time3', type=float)
-        participant.time4 = request.form.get('time4', type=float)
-        participant.time5 = request.form.get('time5', type=float)
-        participant.time6 = request.form.get('time6', type=float)
-        
+        try:
+            results.apply_time_changes({
+                participant.id: {
+                    field: results.parse_time_value(request.form.get(field)) for field in TIME_FIELDS
+                }
+            })
+        except (results.TimeChangeError, results.TimeConflictError) as exc:
+            db.session.rollback()
+            flash(str(exc), 'danger')
+            return redirect(url_for('main.index'))
+
+        DataVersion.bump()
         db.session.commit()
+        active_hub.notify()
         flash('Times and round statuses updated successfully!', 'success')
     
     if 'set_active' in request.form:
-        Participant.query.update({Participant.active: False})
-        participant.active = True
+        LiveState.set_active(participant.id)
+        DataVersion.bump()
         db.session.commit()
+        active_hub.notify()
         flash('Active participant set successfully!', 'success')
 
     return redirect(url_for('main.index'))
@@ -278,185 +427,222 @@ def update_times(id):
 @bp.route('/update_times_bulk', methods=['POST'])
 @login_required
 def update_times_bulk():
-    participants = Participant.query.all()
-    for participant in participants:
-        participant.time1 = request.form.get(f'time1_{participant.id}', type=float)
-        participant.time2 = request.form.get(f'time2_{participant.id}', type=float)
-        participant.time3 = request.form.get(f'time3_{participant.id}', type=float)
-        participant.time4 = request.form.get(f'time4_{participant.id}', type=float)
-        participant.time5 = request.form.get(f'time5_{participant.id}', type=float)
-        participant.time6 = request.form.get(f'time6_{participant.id}', type=float)
-    db.session.commit()
+    # Form fields are named time{n}_{id}; only submitted cells are considered
+    changes = {}
+    try:
+        for key, value in request.form.items():
+            field, _, pid = key.partition('_')
+            if field in TIME_FIELDS and pid.isdigit():
+                changes.setdefault(int(pid), {})[field] = results.parse_time_value(value)
+        changed = results.apply_time_changes(changes)
+    except (results.TimeChangeError, results.TimeConflictError) as exc:
+        # A conflict means another judge changed a cell after the form was read
+        db.session.rollback()
+        flash(str(exc), 'danger')
+        return redirect(url_for('main.index'))
+    if changed:
+        DataVersion.bump()
+        db.session.commit()
+        active_hub.notify()
     flash('Times and round statuses updated successfully!', 'success')
     return redirect(url_for('main.index'))
 
-@bp.route('/finish_round/<string:round>', methods=['POST'])
+@bp.route('/update_times_batch', methods=['POST'])
 @login_required
-def finish_round(round):
-    
+def update_times_batch():
+    """Apply a JSON list of ``{id, field, value}`` time changes in one transaction.
+
+    Responds with the new top times and ranks of the riders in the request.
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('changes')
+    try:
+        changes = results.parse_changes(payload)
+        changed = results.apply_time_changes(changes)
+        if changed:
+            DataVersion.bump()
+            db.session.commit()
+    except results.TimeChangeError as exc:
+        db.session.rollback()
+        return jsonify({'error': str(exc)}), 400
+    except (results.TimeConflictError, IntegrityError):
+        # Another request changed one of the cells between our read and write
+        db.session.rollback()
+        return jsonify({
+            'error': 'Zeiten wurden gleichzeitig geändert, bitte neu laden.',
+            'participants': results.summarize(changes),
+        }), 409
+    if changed:
+        active_hub.notify()
+    return jsonify({
+        'changed': changed,
+        'participants': results.summarize(changes),
+        'data_version': DataVersion.current(),
+    })
+
+@bp.route('/update_time/<int:id>', methods=['POST'])
+@login_required
+def update_time(id):
+    """Save a single time cell from the operator grid.
 
-    if round == 'VR1':
-        participants = Participant.query.all()
-        # Sortiere Teilnehmer nach Zeit in der ersten Vorrunde in absteigender Reihenfolge
-        sorted_participants = sorted(participants, key=lambda p: p.time1 if p.time1 is not None else float('-inf'), reverse=True)
-
-        # Setze alle Teilnehmer auf nicht qualifiziert
-        for participant in participants:
-            participant.round1_qualified = False
-
-        # Qualifiziere alle Teilnehmer mit Zeit >= 99 Sekunden
-        qualified_participants = []
-        for participant in participants:
-            if participant.time1 is not None and participant.time1 >= 99:
-                participant.round1_qualified = True
-                participant.round2_qualified = True
-                participant.round3_qualified = True
-                qualified_participants.append(participant)
-
-        # Fülle die Qualifikationen auf, bis mindestens 5 Teilnehmer qualifiziert sind
-        for participant in sorted_participants:
-            if len(qualified_participants) < 5:
-                if not participant.round1_qualified:  # Nur nicht bereits qualifizierte Teilnehmer hinzufügen
-                    participant.round1_qualified = True
-                    participant.round2_qualified = True
-                    participant.round3_qualified = True
-                    qualified_participants.append(participant)
-            else:
-                break
-
-
-
-    elif round == 'VR2':
-        participants = Participant.query.all()
-        # Sortiere Teilnehmer nach Zeit in der ersten Vorrunde in absteigender Reihenfolge
-        sorted_participants = sorted(participants, key=lambda p: p.time2 if p.time2 is not None else float('-inf'), reverse=True)
-
-
-        # Qualifiziere alle Teilnehmer mit Zeit >= 99 Sekunden
-        qualified_participants = []
-        for participant in participants:
-            if participant.time2 is not None and participant.time2 >= 99:
-                participant.round2_qualified = True
-                participant.round3_qualified = True
-                qualified_participants.append(participant)
-
-        # Fülle die Qualifikationen auf, bis mindestens 5 Teilnehmer qualifiziert sind
-        for participant in sorted_participants:
-            if len(qualified_participants) < 5:
-                if not participant.round2_qualified :  # Nur nicht bereits qualifizierte Teilnehmer hinzufügen
-                    participant.round2_qualified = True
-                    participant.round3_qualified = True
-                    qualified_participants.append(participant)
-            else:
-                break
-
-
-    elif round == 'VR3':
-        participants = Participant.query.all()
-        # Sortiere Teilnehmer nach Zeit in der ersten Vorrunde in absteigender Reihenfolge
-        sorted_participants = sorted(participants, key=lambda p: p.time3 if p.time3 is not None else float('-inf'), reverse=True)
-
-
-        # Qualifiziere alle Teilnehmer mit Zeit >= 99 Sekunden
-        qualified_participants = []
-        for participant in participants:
-            if participant.time3 is not None and participant.time3 >= 99:
-                participant.round3_qualified = True
-                qualified_participants.append(participant)
-
-        # Fülle die Qualifikationen auf, bis mindestens 5 Teilnehmer qualifiziert sind
-        for participant in sorted_participants:
-            if len(qualified_participants) < 5:
-                if not participant.round3_qualified :  # Nur nicht bereits qualifizierte Teilnehmer hinzufügen
-                    participant.round3_qualified = True
-                    qualified_participants.append(participant)
-            else:
-                break
-
-
-    elif round == 'ZR':
-        participants = Participant.query.all()
-
-        # Sortiere Teilnehmer nach Zeit in der Zwischenrunde in absteigender Reihenfolge
-        sorted_participants = sorted(participants, key=lambda p: p.toptime_Zwischenrunde if p.toptime_Zwischenrunde is not None else float('-inf'), reverse=True)
-
-        # Setze das Feld zwischenrunde_qualified auf True für die besten zehn Teilnehmer
-        for i, participant in enumerate(sorted_participants):
-            if i < 10:
-                participant.zwischenrunde_qualified = True
-            else:
-                participant.zwischenrunde_qualified = False
-
-        # Speichere die Änderungen in der Datenbank (abhängig davon, wie du deine DB-Session verwaltest)
+    Expects JSON ``{field, value, expected}``; ``expected`` is the value the
+    client last saw and makes the write a compare-and-set. Answers 409 with
+    the current value if someone else changed the cell in the meantime.
+    """
+    payload = request.get_json(silent=True) or {}
+    field = payload.get('field')
+    try:
+        value = results.parse_time_value(payload.get('value'))
+        if 'expected' in payload:
+            expected = results.parse_time_value(payload['expected'])
+            changed = results.set_time(id, field, value, expected=expected)
+        else:
+            changed = results.set_time(id, field, value)
+    except results.TimeChangeError as exc:
+        db.session.rollback()
+        return jsonify({'error': str(exc)}), 400
+    except results.TimeConflictError as exc:
+        db.session.rollback()
+        return jsonify({'error': str(exc), 'id': id, 'field': field, 'current': exc.current}), 409
+    if changed:
+        DataVersion.bump()
         db.session.commit()
+        active_hub.notify()
+    summary = results.summarize([id])[0]
+    return jsonify({
+        'field': field,
+        'value': value,
+        'changed': changed,
+        'data_version': DataVersion.current(),
+        **summary,
+    })
 
-   
-    elif round == 'FINAL':
-        participants = Participant.query.all()
-        for participant in participants:
-            participant.final_qualified = True
+@bp.route('/finish_round/<string:round>', methods=['POST'])
+@login_required
+def finish_round(round):
+    settings = SiteSettings.get_settings()
+    rule = qualification.rules_for(settings).get(round)
+    if rule is None:
+        flash(f'Unbekannte Runde {round}.', 'danger')
+        return redirect(url_for('main.index'))
 
+    qualification.apply_rule(rule)
+    _align_hide_prelim_flags(settings)
+    DataVersion.bump()
     db.session.commit()
     flash(f'Runde {round} abgeschlossen!', 'success')
-    
+
     return redirect(url_for('main.index'))
 
 
 @bp.route('/set_active/<int:id>', methods=['POST'])
 @login_required
 def set_active(id):
-    Participant.query.update({Participant.active: False})
-    active_participant = Participant.query.get(id)
-    if active_participant:
-        active_participant.active = True
+    # Unknown ids leave nobody active, as before
+    pid = db.session.execute(
+        db.select(Participant.id).where(Participant.id == id, Participant.in_competition())
+    ).scalar()
+    LiveState.set_active(pid)
+    DataVersion.bump()
     db.session.commit()
+    active_hub.notify()
     flash('Active participant set successfully!', 'success')
     return redirect(url_for('main.index'))
 
+def _archive_before_reset(label):
+    """Snapshot the database if the reset form asked for it; False if that failed."""
+    if not request.form.get('archive'):
+        return True
+    try:
+        path = archive.archive_database(f'{Competition.current().slug}-{label}')
+    except archive.ArchiveError as exc:
+        flash(f'{exc} Nichts gelöscht.', 'danger')
+        return False
+    flash(f'Archiv gespeichert: {os.path.basename(path)}', 'info')
+    return True
+
 @bp.route('/reset_results', methods=['POST'])
 @login_required
 def reset_results():
-    participants = Participant.query.all()
-    settings = SiteSettings.get_settings()
-    for participant in participants:
-        participant.active = False
-        participant.time1 = None
-        participant.time2 = None
-        participant.time3 = None
-        participant.time4 = None
-        participant.time5 = None
-        participant.time6 = None
-        participant.round1_qualified = False
-        participant.round2_qualified = False
-        participant.round3_qualified = False
-        participant.zwischenrunde_qualified = False
-        participant.final_qualified = False
-    _ensure_hide_prelim_alignment(settings, participants)
+    if not _archive_before_reset('resultate'):
+        return redirect(url_for('main.index'))
+    # Hidden prelim rounds count as passed, see _align_hide_prelim_flags
+    prelim_passed = bool(SiteSettings.get_settings().hide_prelim_rounds)
+    LiveState.set_active(None)
+    # The journal catch-up clears the top times of everyone who had a run
+    _clear_runs(db.select(Participant.id).where(Participant.in_competition()))
+    db.session.execute(
+        db.update(Participant).where(Participant.in_competition()).values(
+            round1_qualified=prelim_passed,
+            round2_qualified=prelim_passed,
+            round3_qualified=prelim_passed,
+            zwischenrunde_qualified=prelim_passed,
+            final_qualified=False,
+        ),
+        execution_options={'synchronize_session': False},
+    )
+    DataVersion.bump()
     db.session.commit()
+    active_hub.notify()
     flash('All fields have been reset.', 'success')
     return redirect(url_for('main.index'))
 
 @bp.route('/reset_participants', methods=['POST'])
 @login_required
 def reset_participants():
-    Participant.query.delete()
+    if not _archive_before_reset('teilnehmer'):
+        return redirect(url_for('main.participant'))
+    photos = db.session.execute(
+        db.select(Participant.photo)
+        .where(Participant.in_competition(), Participant.photo.isnot(None))
+        .distinct()
+    ).scalars().all()
+    LiveState.clear()
+    _clear_runs(db.select(Participant.id).where(Participant.in_competition()))
+    db.session.execute(
+        db.delete(Participant).where(Participant.in_competition()),
+        execution_options={'synchronize_session': False},
+    )
+    DataVersion.bump()
     db.session.commit()
+    active_hub.notify()
+    # Files shared with other competitions stay; the rest is removed off the request path
+    if photos:
+        tasks.submit('photo-remove', images.release_photos, photos)
     flash('Alle Teilnehmer wurden gelöscht.', 'success')
     return redirect(url_for('main.participant'))
 
+def _export_response(kind, fmt):
+    """Stream an export; rows are read and encoded while the response is sent."""
+    if fmt not in exports.FORMATS:
+        abort(404)
+    settings = SiteSettings.get_settings()
+    chunks = exports.iter_export(kind, fmt, bool(settings.hide_prelim_rounds))
+    filename = f"{'rangliste' if kind == 'ranking' else 'teilnehmer'}-{date.today().isoformat()}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        content_type=exports.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+@bp.route('/export/ranking.<fmt>')
+@bp.route('/c/<competition>/export/ranking.<fmt>')
+def export_ranking(fmt):
+    return _export_response('ranking', fmt)
+
+@bp.route('/export/participants.<fmt>')
+@login_required
+def export_participants(fmt):
+    return _export_response('participants', fmt)
+
 @bp.route('/ranking')
+@bp.route('/c/<competition>/ranking')
+@conditional_on_data_version()
+@micro_cached()
 def ranking():
-    participants = Participant.query.all()
-    rankings = sorted(participants, key=lambda p: (
-            p.toptime_Finalrunde if p.toptime_Finalrunde is not None else float('-inf'),
-            p.toptime_Zwischenrunde if p.toptime_Zwischenrunde is not None else float('-inf'),
-            p.toptime_Vorrunde if p.toptime_Vorrunde is not None else float('-inf')
-    ), reverse=True)
     settings = SiteSettings.get_settings()
-    if _ensure_hide_prelim_alignment(settings, participants):
-        db.session.commit()
-
-    return render_template('ranking.html', title='Rangliste', rankings=rankings, hide_prelim_rounds=settings.hide_prelim_rounds)
+    return render_template('ranking.html', title='Rangliste', ranking_rows=_ranking_rows(settings), hide_prelim_rounds=settings.hide_prelim_rounds)
 
 
  
@@ -0,0 +1,103 @@
+"""Bounded background job queue for chores that should not block a request.
+
+Jobs run on a small thread pool inside each worker process with an app
+context pushed, and their status is kept in a short in-memory history.
+With ``TASKS_EAGER`` (default when ``TESTING``) jobs run synchronously in
+the caller, so tests see their effects immediately.
+"""
+import atexit
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    def __init__(self, app=None):
+        self._app = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TASK_WORKERS', 2)
+        app.config.setdefault('TASK_QUEUE_SIZE', 100)
+        app.config.setdefault('TASK_HISTORY', 200)
+        app.config.setdefault('TASKS_EAGER', app.testing)
+        self._app = app
+        self._slots = threading.BoundedSemaphore(app.config['TASK_QUEUE_SIZE'])
+        app.extensions['tasks'] = self
+        atexit.register(self.shutdown)
+
+    def _get_executor(self):
+        # Created lazily so it is never shared across a gunicorn fork
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._app.config['TASK_WORKERS'],
+                    thread_name_prefix='bullriding-task',
+                )
+            return self._executor
+
+    def _record(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'id': job_id})
+            job.update(fields)
+            while len(self._jobs) > self._app.config['TASK_HISTORY']:
+                self._jobs.popitem(last=False)
+
+    def _run(self, job_id, func, args, kwargs, release):
+        self._record(job_id, status='running', started_at=time.time())
+        try:
+            with self._app.app_context():
+                func(*args, **kwargs)
+        except Exception as exc:
+            logger.exception('Background job %s failed', job_id)
+            self._record(job_id, status='failed', error=str(exc), finished_at=time.time())
+        else:
+            self._record(job_id, status='done', finished_at=time.time())
+        finally:
+            if release:
+                self._slots.release()
+
+    def submit(self, name, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` and return its job id.
+
+        When the queue is full the job runs in the calling thread instead of
+        being dropped, which applies backpressure to the request.
+        """
+        job_id = next(self._ids)
+        self._record(job_id, name=name, status='queued', queued_at=time.time())
+        if self._app.config['TASKS_EAGER']:
+            self._run(job_id, func, args, kwargs, release=False)
+        elif not self._slots.acquire(blocking=False):
+            logger.warning('Task queue full; running %s inline', name)
+            self._run(job_id, func, args, kwargs, release=False)
+        else:
+            self._get_executor().submit(self._run, job_id, func, args, kwargs, True)
+        return job_id
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def jobs(self):
+        """Recent jobs, newest first."""
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def shutdown(self, wait=True):
+        """Finish queued jobs and stop the pool (runs at interpreter exit)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,147 @@
+"""Per-request timing: wall time, SQL statements and template rendering.
+
+With ``REQUEST_TIMING`` enabled every response carries a ``Server-Timing``
+header (shown in the browser's network panel) and the numbers are
+aggregated per endpoint for ``/admin/timing``. When disabled, ``init_app``
+registers no hooks or engine events at all, so requests pay nothing.
+
+Aggregates live in the worker process; with several gunicorn workers each
+one reports the requests it served. Streamed responses (exports, SSE) are
+measured until the response object is returned, not until the last byte.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _EndpointStats:
+    __slots__ = ('count', 'total', 'max', 'queries', 'sql', 'template', 'recent')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.recent = deque(maxlen=window)
+
+
+class RequestTiming:
+    def __init__(self, app=None):
+        self._app = None
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._since = time.time()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REQUEST_TIMING', False)
+        app.config.setdefault('REQUEST_TIMING_WINDOW', 500)
+        self._app = app
+        app.extensions['timing'] = self
+        if not app.config['REQUEST_TIMING']:
+            return
+        with app.app_context():
+            engine = app.extensions['sqlalchemy'].engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    @property
+    def enabled(self):
+        return bool(self._app and self._app.config['REQUEST_TIMING'])
+
+    # Hooks; all of them are no-ops outside a request (CLI, background jobs)
+
+    def _start(self):
+        g.timing = {'start': time.perf_counter(), 'queries': 0, 'sql': 0.0, 'template': 0.0, 'renders': []}
+
+    def _before_cursor_execute(self, conn, _cursor, _statement, _parameters, _context, _executemany):
+        # Statements on one connection never overlap, a failed one is simply overwritten
+        conn.info['timing_start'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, _cursor, _statement, _parameters, _context, _executemany):
+        started = conn.info.pop('timing_start', None)
+        timing = g.get('timing') if has_request_context() else None
+        if timing is not None and started is not None:
+            timing['queries'] += 1
+            timing['sql'] += time.perf_counter() - started
+
+    def _before_render(self, _sender, **_extra):
+        timing = g.get('timing') if has_request_context() else None
+        if timing is not None:
+            timing['renders'].append(time.perf_counter())
+
+    def _after_render(self, _sender, **_extra):
+        timing = g.get('timing') if has_request_context() else None
+        if timing is not None and timing['renders']:
+            started = timing['renders'].pop()
+            # Only the outermost render counts, nested ones are part of it
+            if not timing['renders']:
+                timing['template'] += time.perf_counter() - started
+
+    def _finish(self, response):
+        timing = g.pop('timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing['start']
+        response.headers['Server-Timing'] = ', '.join((
+            f"db;dur={timing['sql'] * 1000:.1f};desc=\"{timing['queries']} SQL\"",
+            f"tpl;dur={timing['template'] * 1000:.1f}",
+            f'app;dur={total * 1000:.1f}',
+        ))
+        self._record(request.endpoint or '<unmatched>', total, timing)
+        return response
+
+    def _record(self, endpoint, total, timing):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _EndpointStats(self._app.config['REQUEST_TIMING_WINDOW'])
+            stats.count += 1
+            stats.total += total
+            stats.max = max(stats.max, total)
+            stats.queries += timing['queries']
+            stats.sql += timing['sql']
+            stats.template += timing['template']
+            stats.recent.append(total)
+
+    def stats(self):
+        """Per-endpoint aggregates of this worker process, slowest (p95) first; times in ms."""
+        with self._lock:
+            rows = [
+                {
+                    'endpoint': endpoint,
+                    'count': stats.count,
+                    'mean_ms': round(stats.total / stats.count * 1000, 2),
+                    'p95_ms': round(_percentile(stats.recent, 0.95) * 1000, 2),
+                    'max_ms': round(stats.max * 1000, 2),
+                    'total_ms': round(stats.total * 1000, 1),
+                    'queries_per_request': round(stats.queries / stats.count, 1),
+                    'sql_ms': round(stats.sql / stats.count * 1000, 2),
+                    'template_ms': round(stats.template / stats.count * 1000, 2),
+                }
+                for endpoint, stats in self._endpoints.items()
+            ]
+            since = self._since
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return {'enabled': self.enabled, 'pid': os.getpid(), 'since': since, 'endpoints': rows}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._since = time.time()
@@ -0,0 +1 @@
+"""Benchmarks for the bullriding app (run with ``python -m benchmarks.<name>``)."""
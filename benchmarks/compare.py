@@ -0,0 +1,48 @@
+"""Compare two result files written by ``benchmarks.routes``.
+
+Prints p50/p99 latency, throughput and queries per request side by side
+with the relative change, per driver and route:
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as source:
+        report = json.load(source)
+    return report['meta'], {(row['driver'], row['route']): row for row in report['results']}
+
+
+def _change(old, new):
+    if not old or new is None:
+        return ''
+    return f'{(new - old) / old:+.0%}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    old_meta, old = _load(args.baseline)
+    new_meta, new = _load(args.candidate)
+    print(f"{old_meta.get('commit')} -> {new_meta.get('commit')}, "
+          f"{old_meta['participants']} -> {new_meta['participants']} participants")
+    print(f"{'driver':<12}{'route':<24}{'p50 ms':>16}{'p99 ms':>16}{'req/s':>16}{'queries':>12}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        columns = [
+            f"{after[name]:>9}{_change(before[name], after[name]):>7}"
+            for name in ('p50_ms', 'p99_ms', 'throughput_rps')
+        ]
+        print(f'{key[0]:<12}{key[1]:<24}' + ''.join(columns)
+              + f"{before['queries_per_request']!s:>6}{after['queries_per_request']!s:>6}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<12}{key[1]:<24}only in {'baseline' if key in old else 'candidate'}")
+
+
+if __name__ == '__main__':
+    main()
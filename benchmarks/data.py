@@ -0,0 +1,93 @@
+"""Synthetic event data for the benchmarks.
+
+``seed_database`` fills an empty database with a configurable number of
+riders: prelim, intermediate and final runs spread like a real event,
+qualification flags matching those times, stored top times and a photo
+path for most riders. Rows are written with executemany per table, so
+seeding 50,000 riders takes seconds.
+"""
+import random
+
+BENCH_USER = ('bench', 'bench')
+
+
+def participant_rows(participants, seed=42, competition_id=1):
+    """Insert parameters ``(participants, runs)`` of one competition, deterministic per ``seed``."""
+    from app.models import TIME_SLOTS
+
+    rng = random.Random(seed)
+    # Photos are content-addressed, so a few files are shared by many riders
+    photos = [f'uploads/{rng.getrandbits(128):032x}.jpg' for _ in range(16)]
+    rows, runs = [], []
+    for n in range(participants):
+        times = {field: None for field in ('time1', 'time2', 'time3', 'time4', 'time5', 'time6')}
+        times['time1'] = round(rng.uniform(5, 120), 1)
+        round1 = times['time1'] >= 99
+        round2 = round1 or rng.random() < 0.5
+        if not round1:
+            times['time2'] = round(rng.uniform(5, 120), 1)
+        if not round2:
+            times['time3'] = round(rng.uniform(5, 120), 1)
+        round3 = round2 or rng.random() < 0.3
+        zwischenrunde = False
+        if round3:
+            times['time4'] = round(rng.uniform(5, 120), 1)
+            times['time5'] = round(rng.uniform(5, 120), 1)
+            zwischenrunde = rng.random() < 0.2
+        if zwischenrunde:
+            times['time6'] = round(rng.uniform(5, 120), 1)
+        runs.extend(
+            {'participant_id': n + 1, 'round': TIME_SLOTS[field][0], 'attempt': TIME_SLOTS[field][1], 'time': value,
+             'competition_id': competition_id}
+            for field, value in times.items() if value is not None
+        )
+        rows.append({
+            'id': n + 1,
+            'competition_id': competition_id,
+            'start_nr': n + 1,
+            'first_name': f'Rider{n}',
+            'last_name': f'Bench{n % 97}',
+            'address': f'Arenaweg {n % 200 + 1}',
+            'postal_code': f'{8000 + n % 900}',
+            'city': rng.choice(('Zürich', 'Bern', 'Luzern', 'Basel', 'St. Gallen')),
+            'email': f'rider{n}@example.com',
+            'phone': None,
+            'photo': rng.choice(photos) if rng.random() < 0.8 else None,
+            'round1_qualified': round1,
+            'round2_qualified': round2,
+            'round3_qualified': round3,
+            'zwischenrunde_qualified': zwischenrunde,
+            'final_qualified': False,
+        })
+    return rows, runs
+
+
+def seed_database(app, participants, seed=42):
+    """Create the schema and insert the riders plus a login ``bench``/``bench``.
+
+    The runs are journaled like entered times, so ``flask journal replay``
+    reproduces the seeded database.
+    """
+    from app import db, journal
+    from app.models import DataVersion, LiveState, Participant, ResultEvent, Run, SiteSettings, User, current_competition_id
+
+    with app.app_context():
+        db.create_all()
+        SiteSettings.ensure_default()
+        user = User(username=BENCH_USER[0], email='bench@example.com')
+        user.set_password(BENCH_USER[1])
+        db.session.add(user)
+        cid = current_competition_id()
+        rows, runs = participant_rows(participants, seed, cid)
+        events = [
+            {'competition_id': cid, 'participant_id': run['participant_id'], 'round': run['round'],
+             'attempt': run['attempt'], 'old_time': None, 'new_time': run['time']}
+            for run in runs
+        ]
+        for model, params in ((Participant, rows), (Run, runs), (ResultEvent, events)):
+            for start in range(0, len(params), 5000):
+                db.session.execute(db.insert(model), params[start:start + 5000])
+        journal.catch_up()
+        LiveState.set_active(rows[0]['id'] if rows else None)
+        DataVersion.bump()
+        db.session.commit()
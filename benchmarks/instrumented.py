@@ -0,0 +1,38 @@
+"""WSGI entry point used by ``benchmarks.routes`` to run the app under gunicorn.
+
+The database comes from ``BENCH_DATABASE``. Every response carries an
+``X-Bench-Queries`` header with the number of SQL statements the request
+executed, so the benchmark can report query counts for the real server
+too. Not meant for production use.
+"""
+import os
+import threading
+
+from sqlalchemy import event
+
+from app import create_app, db
+from benchmarks.routes import make_config
+
+_local = threading.local()
+
+
+def _count_queries(*_args):
+    _local.queries = getattr(_local, 'queries', 0) + 1
+
+
+def _counting(wsgi_app):
+    def middleware(environ, start_response):
+        _local.queries = 0
+
+        def counted_start_response(status, headers, exc_info=None):
+            headers = list(headers) + [('X-Bench-Queries', str(_local.queries))]
+            return start_response(status, headers, exc_info)
+
+        return wsgi_app(environ, counted_start_response)
+    return middleware
+
+
+app = create_app(make_config(os.environ['BENCH_DATABASE']))
+with app.app_context():
+    event.listen(db.engine, 'before_cursor_execute', _count_queries)
+app.wsgi_app = _counting(app.wsgi_app)
@@ -0,0 +1,123 @@
+"""Latency of public reads under spectator bursts, with and without the micro-cache.
+
+Each round simulates a rider finishing: the operator saves a time (which
+bumps the data version and invalidates the caches), then N spectators
+request the same page at the same moment. Reported are the latency
+percentiles over all rounds and the SQL statements executed per burst.
+With ``MICROCACHE_TTL`` set only one thread per burst renders the page;
+the rest costs one primary-key lookup of the data version per request:
+
+    python -m benchmarks.ranking_burst --participants 200 --clients 1 8 32 64
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from benchmarks.sqlite_profile import seed
+from config import Config
+
+PATHS = ('/ranking', '/active', '/active_id')
+
+
+def _make_config(db_path, ttl):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path.replace('\\', '/')
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 80, 'max_overflow': 16, 'pool_timeout': 30}
+        FRAGMENT_CACHE_BACKEND = 'memory'
+        MICROCACHE_TTL = ttl
+        SECRET_KEY = 'benchmark'
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+    return BenchConfig
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(ttl, participants, clients, rounds):
+    from app import create_app, db
+
+    workdir = tempfile.mkdtemp(prefix='bullriding-bench-')
+    try:
+        app = create_app(_make_config(os.path.join(workdir, 'bench.db'), ttl))
+        seed(app, participants)
+        statements = [0]
+        with app.app_context():
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def _count(*_args):
+                statements[0] += 1
+
+        rng = random.Random(1)
+        operator = app.test_client()
+        operator.post('/login', data={'username': 'bench', 'password': 'bench'})
+        spectators = [app.test_client() for _ in range(clients)]
+        latencies, per_burst, errors = [], [], [0]
+        lock = threading.Lock()
+
+        for n in range(rounds):
+            operator.post(
+                f'/update_time/{rng.randint(1, participants)}',
+                json={'field': 'time6', 'value': round(rng.uniform(5, 120), 2)},
+            )
+            path = PATHS[n % len(PATHS)]
+            barrier = threading.Barrier(clients)
+
+            def spectator(client):
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    ok = client.get(path).status_code == 200
+                except Exception:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += not ok
+
+            before = statements[0]
+            threads = [threading.Thread(target=spectator, args=(client,)) for client in spectators]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            per_burst.append(statements[0] - before)
+
+        with app.app_context():
+            db.engine.dispose()
+        return {
+            'p50': statistics.median(latencies) * 1000,
+            'p99': _percentile(latencies, 0.99) * 1000,
+            'queries': statistics.mean(per_burst),
+            'errors': errors[0],
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--ttl', type=float, default=Config.MICROCACHE_TTL or 2.0)
+    args = parser.parse_args()
+
+    print(f"{'micro-cache':<14}{'clients':>8}{'p50 ms':>10}{'p99 ms':>10}{'SQL/burst':>11}{'errors':>8}")
+    for label, ttl in (('off', 0), (f'ttl {args.ttl:g}s', args.ttl)):
+        for clients in args.clients:
+            result = run(ttl, args.participants, clients, args.rounds)
+            print(f"{label:<14}{clients:>8}{result['p50']:>10.1f}{result['p99']:>10.1f}"
+                  f"{result['queries']:>11.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""Benchmark the app's routes against a synthetic event and write the results as JSON.
+
+A database with ``--participants`` riders is seeded (see ``benchmarks.data``)
+and every scenario below is driven through the Flask test client
+(sequentially, in process) and through a real gunicorn server (concurrent
+HTTP clients). For each route the run records throughput, p50/p95/p99
+latency, SQL statements per request and errors. Compare two runs with
+``python -m benchmarks.compare``.
+
+    python -m benchmarks.routes --participants 5000 --requests 200
+    python -m benchmarks.routes --driver test-client --only ranking update_time
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from config import Config
+
+from benchmarks.data import BENCH_USER, seed_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIME_FIELDS = ('time1', 'time2', 'time3', 'time4', 'time5', 'time6')
+
+
+def make_config(db_path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path.replace('\\', '/')
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 32, 'max_overflow': 8, 'pool_timeout': 30}
+        FRAGMENT_CACHE_PATH = db_path + '.fragments'
+        SECRET_KEY = 'benchmark'
+        WTF_CSRF_ENABLED = False
+        TASKS_EAGER = True
+    return BenchConfig
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    path: str
+    form: dict = None
+    json: object = None
+    auth: bool = False
+
+
+def _time(rng):
+    return round(rng.uniform(5, 120), 1)
+
+
+def _bulk_form(rng, participants):
+    # The grid posts every input; one cell differs from what is stored
+    form = {f'time4_{pid}': '' for pid in range(1, participants + 1)}
+    form[f'time4_{rng.randint(1, participants)}'] = str(_time(rng))
+    return form
+
+
+# name -> factory(rng, participants) returning the next Request
+SCENARIOS = {
+    'ranking': lambda rng, n: Request('GET', '/ranking'),
+    'index_anonymous': lambda rng, n: Request('GET', '/index'),
+    'index_operator': lambda rng, n: Request('GET', '/index', auth=True),
+    'active': lambda rng, n: Request('GET', '/active'),
+    'active_id': lambda rng, n: Request('GET', '/active_id'),
+    'participants': lambda rng, n: Request('GET', '/participants', auth=True),
+    'export_ranking_csv': lambda rng, n: Request('GET', '/export/ranking.csv'),
+    'update_times': lambda rng, n: Request(
+        'POST', f'/update_times/{rng.randint(1, n)}', auth=True,
+        form={'update_times': '1', **{field: str(_time(rng)) for field in TIME_FIELDS}},
+    ),
+    'update_times_bulk': lambda rng, n: Request(
+        'POST', '/update_times_bulk', auth=True, form=_bulk_form(rng, n),
+    ),
+    'update_times_batch': lambda rng, n: Request(
+        'POST', '/update_times_batch', auth=True,
+        json=[{'id': rng.randint(1, n), 'field': 'time5', 'value': _time(rng)} for _ in range(10)],
+    ),
+    'update_time': lambda rng, n: Request(
+        'POST', f'/update_time/{rng.randint(1, n)}', auth=True,
+        json={'field': 'time6', 'value': _time(rng)},
+    ),
+    'set_active': lambda rng, n: Request('POST', f'/set_active/{rng.randint(1, n)}', auth=True),
+    **{
+        f'finish_round_{round_name}': (
+            lambda rng, n, round_name=round_name: Request('POST', f'/finish_round/{round_name}', auth=True)
+        )
+        for round_name in ('VR1', 'VR2', 'VR3', 'ZR', 'FINAL')
+    },
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summarize(latencies, queries, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(statistics.mean(queries), 1) if queries else None,
+        'errors': errors,
+    }
+
+
+def _ok(status):
+    return 200 <= status < 400
+
+
+class TestClientDriver:
+    """Runs requests one after another through ``app.test_client()``."""
+    name = 'test-client'
+
+    def __init__(self, db_path, **_options):
+        from sqlalchemy import event
+
+        from app import create_app, db
+
+        self.app = create_app(make_config(db_path))
+        self._queries = 0
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._count)
+        self.anonymous = self.app.test_client()
+        self.operator = self.app.test_client()
+        self.operator.post('/login', data={'username': BENCH_USER[0], 'password': BENCH_USER[1]})
+
+    def _count(self, *_args):
+        self._queries += 1
+
+    def run(self, factory, participants, count, warmup, rng):
+        for _ in range(warmup):
+            self._send(factory(rng, participants))
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(count):
+            request = factory(rng, participants)
+            before = self._queries
+            t0 = time.perf_counter()
+            status = self._send(request)
+            latencies.append(time.perf_counter() - t0)
+            queries.append(self._queries - before)
+            errors += not _ok(status)
+        return _summarize(latencies, queries, errors, time.perf_counter() - started)
+
+    def _send(self, request):
+        client = self.operator if request.auth else self.anonymous
+        response = client.open(request.path, method=request.method, data=request.form, json=request.json)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        from app import db
+
+        with self.app.app_context():
+            db.engine.dispose()
+
+
+class GunicornDriver:
+    """Starts gunicorn on a free port and drives it with concurrent HTTP clients."""
+    name = 'gunicorn'
+
+    def __init__(self, db_path, workers=2, threads=16, concurrency=8):
+        self.concurrency = concurrency
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        env = dict(os.environ, BENCH_DATABASE=db_path, PYTHONPATH=ROOT)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'gthread',
+             '--threads', str(threads), '-b', f'127.0.0.1:{self.port}', '--log-level', 'warning',
+             'benchmarks.instrumented:app'],
+            cwd=ROOT, env=env,
+        )
+        self._wait_until_ready()
+        self.cookie = self._login()
+
+    def _wait_until_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                connection.request('GET', '/active_id')
+                connection.getresponse().read()
+                connection.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('gunicorn did not start in time')
+
+    def _login(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        body = urlencode({'username': BENCH_USER[0], 'password': BENCH_USER[1]})
+        connection.request('POST', '/login', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        cookies = [header.split(';', 1)[0] for name, header in response.getheaders()
+                   if name.lower() == 'set-cookie']
+        return '; '.join(cookies)
+
+    def _send(self, connection, request):
+        headers = {}
+        body = None
+        if request.form is not None:
+            body = urlencode(request.form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif request.json is not None:
+            body = json.dumps(request.json)
+            headers['Content-Type'] = 'application/json'
+        if request.auth:
+            headers['Cookie'] = self.cookie
+        connection.request(request.method, request.path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, int(response.getheader('X-Bench-Queries', '0'))
+
+    def run(self, factory, participants, count, warmup, rng):
+        lock = threading.Lock()
+        latencies, queries, errors = [], [], [0]
+        per_client = max(1, count // self.concurrency)
+        seeds = [rng.random() for _ in range(self.concurrency)]
+
+        def client(seed_value, measure):
+            local_rng = random.Random(seed_value)
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            samples = []
+            for _ in range(per_client if measure else max(1, warmup // self.concurrency)):
+                request = factory(local_rng, participants)
+                t0 = time.perf_counter()
+                try:
+                    status, executed = self._send(connection, request)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                    status, executed = 599, 0
+                samples.append((time.perf_counter() - t0, executed, status))
+            connection.close()
+            if measure:
+                with lock:
+                    for elapsed, executed, status in samples:
+                        latencies.append(elapsed)
+                        queries.append(executed)
+                        errors[0] += not _ok(status)
+
+        for measure in (False, True):
+            threads = [threading.Thread(target=client, args=(seed_value, measure)) for seed_value in seeds]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return _summarize(latencies, queries, errors[0], time.perf_counter() - started)
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+DRIVERS = {driver.name: driver for driver in (TestClientDriver, GunicornDriver)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(participants, scenarios, drivers, count, warmup, seed=1, **options):
+    """Seed a fresh database per driver and run ``scenarios``; returns the result dict."""
+    from app import create_app
+
+    results = []
+    for driver_name in drivers:
+        workdir = tempfile.mkdtemp(prefix='bullriding-bench-')
+        try:
+            db_path = os.path.join(workdir, 'bench.db')
+            seed_database(create_app(make_config(db_path)), participants)
+            driver = DRIVERS[driver_name](db_path, **options)
+            try:
+                for name in scenarios:
+                    summary = driver.run(SCENARIOS[name], participants, count, warmup, random.Random(seed))
+                    results.append({'route': name, 'driver': driver_name, **summary})
+                    print(f"{driver_name:<12}{name:<24}{summary['throughput_rps']:>9}/s"
+                          f"{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f} ms"
+                          f"{summary['queries_per_request'] or 0:>7.1f} q{summary['errors']:>5} err",
+                          file=sys.stderr)
+            finally:
+                driver.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'participants': participants,
+            'requests': count,
+            'warmup': warmup,
+            **options,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--participants', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--driver', choices=sorted(DRIVERS) + ['all'], default='all')
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='Run these routes only.')
+    parser.add_argument('--concurrency', type=int, default=8, help='HTTP clients (gunicorn driver).')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--output', help='JSON file (default: benchmarks/results/<time>-<commit>.json)')
+    args = parser.parse_args()
+
+    drivers = sorted(DRIVERS, reverse=True) if args.driver == 'all' else [args.driver]
+    options = {}
+    if 'gunicorn' in drivers:
+        options = {'concurrency': args.concurrency, 'workers': args.workers, 'threads': args.threads}
+    report = run_suite(
+        args.participants, args.only or list(SCENARIOS), drivers, args.requests, args.warmup, **options,
+    )
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(ROOT, 'benchmarks', 'results', f"{stamp}-{report['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as target:
+        json.dump(report, target, indent=2)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Mixed read/write throughput with and without the SQLite profile.
+
+Spectator threads render ``/ranking`` while operator threads save single
+time cells through ``/update_time/<id>``, both against a file database.
+Run once with ``SQLITE_PRAGMAS`` empty (SQLite defaults) and once with the
+profile from ``Config``:
+
+    python -m benchmarks.sqlite_profile --participants 200 --seconds 10
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from config import Config
+
+
+def _make_config(db_path, pragmas):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path.replace('\\', '/')
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 32, 'max_overflow': 8, 'pool_timeout': 30}
+        SQLITE_PRAGMAS = pragmas
+        SECRET_KEY = 'benchmark'
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+    return BenchConfig
+
+
+def seed(app, participants):
+    from app import db
+    from app.models import User, Participant, Run, SiteSettings, TIME_SLOTS, current_competition_id
+
+    with app.app_context():
+        db.create_all()
+        SiteSettings.ensure_default()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        rng = random.Random(42)
+        for n in range(participants):
+            participant = Participant(
+                competition_id=current_competition_id(), start_nr=n + 1, first_name=f'Rider{n}', last_name='Bench',
+                address='Arena 1', postal_code='8000', city='Zürich',
+            )
+            for field in ('time1', 'time2', 'time3', 'time4', 'time5'):
+                round_name, attempt = TIME_SLOTS[field]
+                participant.runs.append(Run(
+                    round=round_name, attempt=attempt, time=round(rng.uniform(5, 120), 2),
+                    competition_id=participant.competition_id,
+                ))
+            db.session.add(participant)
+        db.session.flush()
+        Participant.refresh_toptimes()
+        db.session.commit()
+
+
+def run(pragmas, participants, seconds, readers, writers):
+    from app import create_app, db
+
+    workdir = tempfile.mkdtemp(prefix='bullriding-bench-')
+    try:
+        app = create_app(_make_config(os.path.join(workdir, 'bench.db'), pragmas))
+        seed(app, participants)
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        stop = time.monotonic() + seconds
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            client = app.test_client()
+            while time.monotonic() < stop:
+                try:
+                    response = client.get('/ranking')
+                except Exception:  # e.g. "database is locked" under TESTING
+                    count('errors')
+                    continue
+                count('reads' if response.status_code == 200 else 'errors')
+
+        def writer(seed_value):
+            rng = random.Random(seed_value)
+            client = app.test_client()
+            client.post('/login', data={'username': 'bench', 'password': 'bench'})
+            while time.monotonic() < stop:
+                try:
+                    response = client.post(
+                        f'/update_time/{rng.randint(1, participants)}',
+                        json={'field': 'time4', 'value': round(rng.uniform(5, 120), 2)},
+                    )
+                except Exception:
+                    count('errors')
+                    continue
+                count('writes' if response.status_code == 200 else 'errors')
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+        return {key: value / seconds for key, value in counts.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+
+    profiles = [('sqlite defaults', {}), ('Config.SQLITE_PRAGMAS', Config.SQLITE_PRAGMAS or {})]
+    print(f"{'profile':<24}{'reads/s':>10}{'writes/s':>10}{'errors/s':>10}")
+    for name, pragmas in profiles:
+        result = run(pragmas, args.participants, args.seconds, args.readers, args.writers)
+        print(f"{name:<24}{result['reads']:>10.1f}{result['writes']:>10.1f}{result['errors']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -41,8 +41,12 @@ class Config:
 
     # UI configuration
     SITE_NAME = os.getenv("SITE_NAME", "Mechanical Bullriding")
+    # Slug of the competition served under / (default: the oldest one)
+    DEFAULT_COMPETITION = os.getenv("DEFAULT_COMPETITION")
     # Uploads
     UPLOAD_FOLDER = os.path.join(basedir, "app", "static", "uploads")
+    # Snapshots taken by "archive before reset" and `flask archive` (default: archive/ next to the SQLite file)
+    ARCHIVE_FOLDER = os.getenv("ARCHIVE_FOLDER")
     # Helper: parse byte sizes like "16MB", "10 MiB", or raw bytes
     def _parse_size_bytes(value, default): # type: ignore
         if value is None:
@@ -93,3 +97,53 @@ class Config:
     )  # 16MB default
     # Feature flags
     ALLOW_REGISTRATION = os.getenv("ALLOW_REGISTRATION", "false").lower() in ("1", "true", "yes")
+    # Seconds a logged-in user's identity is cached per process by load_user
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+    # Rendered ranking rows: "sqlite" shares them between the workers of a host, "memory" is per process
+    FRAGMENT_CACHE_BACKEND = os.getenv("FRAGMENT_CACHE_BACKEND", "sqlite")
+    FRAGMENT_CACHE_PATH = os.getenv("FRAGMENT_CACHE_PATH")  # default: file in the temp dir
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "64"))
+    # Seconds /ranking, /active and /active_id responses are shared per process (0 disables)
+    MICROCACHE_TTL = float(os.getenv("MICROCACHE_TTL", "2"))
+    MICROCACHE_MAX_ENTRIES = int(os.getenv("MICROCACHE_MAX_ENTRIES", "256"))
+    # Server-Timing headers and per-endpoint aggregates under /admin/timing (off: no overhead)
+    REQUEST_TIMING = os.getenv("REQUEST_TIMING", "false").lower() in ("1", "true", "yes")
+    REQUEST_TIMING_WINDOW = int(os.getenv("REQUEST_TIMING_WINDOW", "500"))  # recent requests for p95
+
+    # Database engine tuning
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))  # matches gunicorn --threads
+    # Concurrent /events/active streams per worker; each holds a thread, so keep it well below --threads
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", str(max(1, DB_POOL_SIZE // 4))))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "4"))
+    if SQLALCHEMY_DATABASE_URI.startswith("sqlite:///") and ":memory:" not in SQLALCHEMY_DATABASE_URI:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": 30,
+        }
+    elif not SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+            "pool_recycle": 1800,
+        }
+
+    # SQLite performance profile, applied to every new connection (see app/__init__.py).
+    # WAL lets spectator reads run concurrently with the operator's writes;
+    # set SQLITE_TUNING=false to use SQLite's defaults.
+    SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() in ("1", "true", "yes")
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-16000")),  # negative = KiB
+        "mmap_size": _parse_size_bytes(os.getenv("SQLITE_MMAP_SIZE"), 128 * 1024 * 1024),  # type: ignore
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    } if SQLITE_TUNING else {}
+
+    # Photo variants generated on upload (target width in px); see app/images.py
+    PHOTO_SIZES = {"thumb": 96, "stage": 720}
+    PHOTO_QUALITY = int(os.getenv("PHOTO_QUALITY", "82"))
+    # Content-addressed uploads never change, so browsers may keep them for good
+    PHOTO_CACHE_MAX_AGE = int(os.getenv("PHOTO_CACHE_MAX_AGE", str(365 * 24 * 3600)))
@@ -6,5 +6,11 @@ sleep 2
 # Apply migrations; do not init/migrate inside the container
 flask db upgrade
 
+# Move photos from before content addressing to hash-named files
+flask photos rehash || true
+
+# Create thumbnail/stage sizes for photos that do not have them yet
+flask photos variants || true
+
 # Start the Flask application (command provided by Dockerfile/compose)
 exec "$@"
@@ -1,8 +1,13 @@
-from app import db
+from app import create_app, db
+from app.models import SiteSettings
 
 def init_db():
     # Stellen Sie sicher, dass der Pfad zur Datenbankdatei korrekt ist
-    db.create_all()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        # Default settings are created here, not on the request path
+        SiteSettings.ensure_default()
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,69 @@
+"""add persisted participant top times
+
+Revision ID: 3f1c7a9e5b42
+Revises: 6e976db93cb2
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c7a9e5b42'
+down_revision = '6e976db93cb2'
+branch_labels = None
+depends_on = None
+
+
+def _max_time(*times):
+    values = [t for t in times if t is not None]
+    return max(values) if values else None
+
+
+def upgrade():
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('toptime_Vorrunde', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('toptime_Zwischenrunde', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('toptime_Finalrunde', sa.Float(), nullable=True))
+
+    # Backfill existing rows from the individual run times
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        'SELECT id, time1, time2, time3, time4, time5, time6 FROM participant'
+    )).fetchall()
+    updates = [
+        {
+            'id': row[0],
+            'vr': _max_time(row[1], row[2], row[3]),
+            'zr': _max_time(row[4], row[5]),
+            'final': _max_time(row[6]),
+        }
+        for row in rows
+    ]
+    if updates:
+        conn.execute(sa.text(
+            'UPDATE participant SET toptime_Vorrunde = :vr, '
+            'toptime_Zwischenrunde = :zr, toptime_Finalrunde = :final '
+            'WHERE id = :id'
+        ), updates)
+
+    op.create_index(
+        'ix_participant_ranking',
+        'participant',
+        [
+            sa.text('toptime_Finalrunde DESC'),
+            sa.text('toptime_Zwischenrunde DESC'),
+            sa.text('toptime_Vorrunde DESC'),
+            'id',
+        ],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.drop_column('toptime_Finalrunde')
+        batch_op.drop_column('toptime_Zwischenrunde')
+        batch_op.drop_column('toptime_Vorrunde')
@@ -0,0 +1,95 @@
+"""add competitions and scope participants and settings to them
+
+Revision ID: a4d9e2c7b5f1
+Revises: f2b8d4a6c1e3
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d9e2c7b5f1'
+down_revision = 'f2b8d4a6c1e3'
+branch_labels = None
+depends_on = None
+
+# Names the unnamed UNIQUE(start_nr) of the initial schema so batch mode can drop it
+NAMING = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def upgrade():
+    op.create_table(
+        'competition',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('slug', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slug'),
+    )
+    # Everything recorded so far belongs to the first competition; its
+    # counters are the existing data_version row with id 1
+    op.execute(sa.text(
+        "INSERT INTO competition (id, name, slug, created_at) "
+        "VALUES (1, 'Wettbewerb', 'default', CURRENT_TIMESTAMP)"
+    ))
+
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None, naming_convention=NAMING) as batch_op:
+        batch_op.add_column(sa.Column('competition_id', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.drop_constraint('uq_participant_start_nr', type_='unique')
+        batch_op.create_unique_constraint('uq_participant_start_nr', ['competition_id', 'start_nr'])
+        batch_op.create_foreign_key('fk_participant_competition', 'competition', ['competition_id'], ['id'])
+    op.create_index(
+        'ix_participant_ranking',
+        'participant',
+        [
+            'competition_id',
+            sa.text('toptime_Finalrunde DESC'),
+            sa.text('toptime_Zwischenrunde DESC'),
+            sa.text('toptime_Vorrunde DESC'),
+            'id',
+        ],
+        unique=False,
+    )
+
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('competition_id', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.create_unique_constraint('uq_site_settings_competition', ['competition_id'])
+        batch_op.create_foreign_key('fk_site_settings_competition', 'competition', ['competition_id'], ['id'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text('DELETE FROM run WHERE participant_id IN '
+                         '(SELECT id FROM participant WHERE competition_id != 1)'))
+    conn.execute(sa.text('DELETE FROM participant WHERE competition_id != 1'))
+    conn.execute(sa.text('DELETE FROM site_settings WHERE competition_id != 1'))
+    conn.execute(sa.text('DELETE FROM data_version WHERE id != 1'))
+
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_site_settings_competition', type_='foreignkey')
+        batch_op.drop_constraint('uq_site_settings_competition', type_='unique')
+        batch_op.drop_column('competition_id')
+
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_participant_competition', type_='foreignkey')
+        batch_op.drop_constraint('uq_participant_start_nr', type_='unique')
+        batch_op.create_unique_constraint('uq_participant_start_nr', ['start_nr'])
+        batch_op.drop_column('competition_id')
+    op.create_index(
+        'ix_participant_ranking',
+        'participant',
+        [
+            sa.text('toptime_Finalrunde DESC'),
+            sa.text('toptime_Zwischenrunde DESC'),
+            sa.text('toptime_Vorrunde DESC'),
+            'id',
+        ],
+        unique=False,
+    )
+
+    op.drop_table('competition')
@@ -0,0 +1,26 @@
+"""add users version stamp to data_version
+
+Revision ID: b6e1f3a9c2d5
+Revises: d8b2e5f4a7c3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1f3a9c2d5'
+down_revision = 'd8b2e5f4a7c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('data_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('users_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('data_version', schema=None) as batch_op:
+        batch_op.drop_column('users_version')
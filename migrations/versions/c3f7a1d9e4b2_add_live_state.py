@@ -0,0 +1,62 @@
+"""store the active participant as one pointer row per competition
+
+Revision ID: c3f7a1d9e4b2
+Revises: a4d9e2c7b5f1
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a1d9e4b2'
+down_revision = 'a4d9e2c7b5f1'
+branch_labels = None
+depends_on = None
+
+RANKING_INDEX = [
+    'competition_id',
+    sa.text('toptime_Finalrunde DESC'),
+    sa.text('toptime_Zwischenrunde DESC'),
+    sa.text('toptime_Vorrunde DESC'),
+    'id',
+]
+
+
+def upgrade():
+    op.create_table(
+        'live_state',
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('participant_id', sa.Integer(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['competition_id'], ['competition.id']),
+        sa.ForeignKeyConstraint(['participant_id'], ['participant.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('competition_id'),
+    )
+    # Carry the flag over; should several riders be flagged, the lowest id wins
+    op.execute(sa.text(
+        'INSERT INTO live_state (competition_id, participant_id, changed_at) '
+        'SELECT competition.id, (SELECT MIN(participant.id) FROM participant '
+        'WHERE participant.competition_id = competition.id AND participant.active), '
+        'CURRENT_TIMESTAMP FROM competition'
+    ))
+
+    # The batch rebuild would recreate the ranking index without its DESC order
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.drop_column('active')
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('active', sa.Boolean(), nullable=True))
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+
+    op.execute(sa.text(
+        'UPDATE participant SET active = EXISTS (SELECT 1 FROM live_state '
+        'WHERE live_state.participant_id = participant.id)'
+    ))
+    op.drop_table('live_state')
@@ -0,0 +1,30 @@
+"""add qualification settings
+
+Revision ID: c5e8a1d4f2b9
+Revises: 9d4b2e6a1c37
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1d4f2b9'
+down_revision = '9d4b2e6a1c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('prelim_threshold', sa.Float(), nullable=False, server_default='99'))
+        batch_op.add_column(sa.Column('prelim_min_qualified', sa.Integer(), nullable=False, server_default='5'))
+        batch_op.add_column(sa.Column('intermediate_top_n', sa.Integer(), nullable=False, server_default='10'))
+
+
+def downgrade():
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.drop_column('intermediate_top_n')
+        batch_op.drop_column('prelim_min_qualified')
+        batch_op.drop_column('prelim_threshold')
@@ -0,0 +1,58 @@
+"""add the append-only results journal and its consumer cursors
+
+Revision ID: d8b2e5f4a7c3
+Revises: c3f7a1d9e4b2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b2e5f4a7c3'
+down_revision = 'c3f7a1d9e4b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'result_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('participant_id', sa.Integer(), nullable=False),
+        sa.Column('round', sa.String(length=16), nullable=False),
+        sa.Column('attempt', sa.Integer(), nullable=False),
+        sa.Column('old_time', sa.Float(), nullable=True),
+        sa.Column('new_time', sa.Float(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_result_event_participant_id', 'result_event', ['participant_id'], unique=False)
+    op.create_table(
+        'journal_cursor',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    # Times recorded so far become the first events, so a replay into an
+    # empty database reproduces them; the stored top times already match
+    op.execute(sa.text(
+        'INSERT INTO result_event (competition_id, participant_id, round, attempt, old_time, new_time, created_at) '
+        'SELECT participant.competition_id, run.participant_id, run.round, run.attempt, NULL, run.time, CURRENT_TIMESTAMP '
+        'FROM run JOIN participant ON participant.id = run.participant_id '
+        'ORDER BY run.participant_id, run.round, run.attempt'
+    ))
+    op.execute(sa.text(
+        "INSERT INTO journal_cursor (name, position) "
+        "SELECT 'toptimes', COALESCE(MAX(id), 0) FROM result_event"
+    ))
+
+
+def downgrade():
+    op.drop_table('journal_cursor')
+    op.drop_index('ix_result_event_participant_id', table_name='result_event')
+    op.drop_table('result_event')
@@ -0,0 +1,35 @@
+"""add settings version and default settings row
+
+Revision ID: e7a3c9f1b6d8
+Revises: c5e8a1d4f2b9
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c9f1b6d8'
+down_revision = 'c5e8a1d4f2b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('data_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('settings_version', sa.Integer(), nullable=False, server_default='1'))
+
+    # The default settings row is created here instead of on the request path
+    conn = op.get_bind()
+    if conn.execute(sa.text('SELECT COUNT(*) FROM site_settings')).scalar() == 0:
+        conn.execute(sa.text(
+            'INSERT INTO site_settings '
+            '(hide_prelim_rounds, prelim_threshold, prelim_min_qualified, intermediate_top_n) '
+            'VALUES (:hide, 99, 5, 10)'
+        ), {'hide': False})
+
+
+def downgrade():
+    with op.batch_alter_table('data_version', schema=None) as batch_op:
+        batch_op.drop_column('settings_version')
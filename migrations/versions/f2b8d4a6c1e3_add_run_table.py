@@ -0,0 +1,77 @@
+"""move participant times into a normalized run table
+
+Revision ID: f2b8d4a6c1e3
+Revises: e7a3c9f1b6d8
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4a6c1e3'
+down_revision = 'e7a3c9f1b6d8'
+branch_labels = None
+depends_on = None
+
+# Former participant column -> (round, attempt), as in app.models.TIME_SLOTS
+SLOTS = {
+    'time1': ('VR', 1),
+    'time2': ('VR', 2),
+    'time3': ('VR', 3),
+    'time4': ('ZR', 1),
+    'time5': ('ZR', 2),
+    'time6': ('FINAL', 1),
+}
+RANKING_INDEX = [
+    sa.text('toptime_Finalrunde DESC'),
+    sa.text('toptime_Zwischenrunde DESC'),
+    sa.text('toptime_Vorrunde DESC'),
+    'id',
+]
+
+
+def upgrade():
+    op.create_table(
+        'run',
+        sa.Column('participant_id', sa.Integer(), nullable=False),
+        sa.Column('round', sa.String(length=16), nullable=False),
+        sa.Column('attempt', sa.Integer(), nullable=False),
+        sa.Column('time', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['participant_id'], ['participant.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('participant_id', 'round', 'attempt'),
+    )
+    op.create_index('ix_run_round_time', 'run', ['round', sa.text('time DESC')], unique=False)
+
+    conn = op.get_bind()
+    for column, (round_name, attempt) in SLOTS.items():
+        conn.execute(sa.text(
+            f'INSERT INTO run (participant_id, round, attempt, time) '
+            f'SELECT id, :round, :attempt, {column} FROM participant WHERE {column} IS NOT NULL'
+        ), {'round': round_name, 'attempt': attempt})
+
+    # The batch rebuild would recreate the ranking index without its DESC order
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        for column in reversed(SLOTS):
+            batch_op.drop_column(column)
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        for column in SLOTS:
+            batch_op.add_column(sa.Column(column, sa.Float(), nullable=True))
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+
+    conn = op.get_bind()
+    for column, (round_name, attempt) in SLOTS.items():
+        conn.execute(sa.text(
+            f'UPDATE participant SET {column} = (SELECT time FROM run '
+            f'WHERE run.participant_id = participant.id AND round = :round AND attempt = :attempt)'
+        ), {'round': round_name, 'attempt': attempt})
+
+    op.drop_index('ix_run_round_time', table_name='run')
+    op.drop_table('run')
@@ -0,0 +1,79 @@
+"""lead the run and journal indexes with competition_id, drop backfill defaults
+
+Revision ID: f9c4a2e7d1b3
+Revises: b6e1f3a9c2d5
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9c4a2e7d1b3'
+down_revision = 'b6e1f3a9c2d5'
+branch_labels = None
+depends_on = None
+
+RANKING_INDEX = [
+    'competition_id',
+    sa.text('toptime_Finalrunde DESC'),
+    sa.text('toptime_Zwischenrunde DESC'),
+    sa.text('toptime_Vorrunde DESC'),
+    'id',
+]
+
+
+def upgrade():
+    # run gets its participant's competition so the index can lead with it
+    op.drop_index('ix_run_round_time', table_name='run')
+    with op.batch_alter_table('run', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('competition_id', sa.Integer(), nullable=True))
+    op.execute(sa.text(
+        'UPDATE run SET competition_id = '
+        '(SELECT participant.competition_id FROM participant WHERE participant.id = run.participant_id)'
+    ))
+    # Runs of deleted participants (SQLite does not cascade without the pragma)
+    op.execute(sa.text('DELETE FROM run WHERE competition_id IS NULL'))
+    with op.batch_alter_table('run', schema=None) as batch_op:
+        batch_op.alter_column('competition_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_run_competition', 'competition', ['competition_id'], ['id'])
+    op.create_index(
+        'ix_run_competition_round_time', 'run', ['competition_id', 'round', sa.text('time DESC')], unique=False
+    )
+
+    op.drop_index('ix_result_event_participant_id', table_name='result_event')
+    op.create_index(
+        'ix_result_event_competition_participant', 'result_event', ['competition_id', 'participant_id'], unique=False
+    )
+
+    # The defaults only served the backfill in a4d9e2c7b5f1; new rows always
+    # name their competition. The batch rebuild would drop the DESC order.
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.alter_column('competition_id', existing_type=sa.Integer(), existing_nullable=False,
+                              server_default=None)
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.alter_column('competition_id', existing_type=sa.Integer(), existing_nullable=False,
+                              server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('site_settings', schema=None) as batch_op:
+        batch_op.alter_column('competition_id', existing_type=sa.Integer(), existing_nullable=False,
+                              server_default='1')
+    op.drop_index('ix_participant_ranking', table_name='participant')
+    with op.batch_alter_table('participant', schema=None) as batch_op:
+        batch_op.alter_column('competition_id', existing_type=sa.Integer(), existing_nullable=False,
+                              server_default='1')
+    op.create_index('ix_participant_ranking', 'participant', RANKING_INDEX, unique=False)
+
+    op.drop_index('ix_result_event_competition_participant', table_name='result_event')
+    op.create_index('ix_result_event_participant_id', 'result_event', ['participant_id'], unique=False)
+
+    op.drop_index('ix_run_competition_round_time', table_name='run')
+    with op.batch_alter_table('run', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_run_competition', type_='foreignkey')
+        batch_op.drop_column('competition_id')
+    op.create_index('ix_run_round_time', 'run', ['round', sa.text('time DESC')], unique=False)
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+from sqlalchemy import event
+
+os.environ.setdefault('SECRET_KEY', 'test')
+
+from config import Config
+from app import create_app, db
+from app.caching import _micro_cache
+from app.models import Competition, Participant, SiteSettings, User, _identity_cache
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    # Every request must reach the database so the tests see what it does
+    MICROCACHE_TTL = 0
+    SSE_KEEPALIVE = 0.05
+    SSE_MAX_STREAM_SECONDS = 0.1
+
+
+def _reset_process_caches():
+    # Class-level caches outlive an app; each test starts on a new database
+    _identity_cache._items.clear()
+    _micro_cache.clear()
+    SiteSettings._cache.clear()
+    Competition._ids.clear()
+    Competition._slugs.clear()
+    Competition._default_id = None
+
+
+@pytest.fixture
+def app(tmp_path):
+    static = tmp_path / 'static'
+    config = type('Config', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'site.db'}",
+        'FRAGMENT_CACHE_PATH': str(tmp_path / 'fragments.db'),
+        'UPLOAD_FOLDER': str(static / 'uploads'),
+        'ARCHIVE_FOLDER': str(tmp_path / 'archive'),
+    })
+    _reset_process_caches()
+    app = create_app(config)
+    # Photos are stored relative to the static folder
+    app.static_folder = str(static)
+    with app.app_context():
+        db.create_all()
+        SiteSettings.ensure_default()
+        user = User(username='operator', email='operator@example.ch')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    _reset_process_caches()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def login(username='operator', password='secret'):
+        response = client.post('/login', data={'username': username, 'password': password})
+        assert response.status_code == 302
+        return response
+    return login
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements sent on ``db.engine`` while the test runs."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def participants(app):
+    """Three riders with times; the first one is active."""
+    from app import results
+    from app.models import LiveState
+
+    with app.app_context():
+        cid = Competition.default_id()
+        riders = [
+            Participant(competition_id=cid, start_nr=nr, first_name=name, last_name='Test',
+                        address='Dorfstrasse 1', postal_code='3000', city='Bern',
+                        round1_qualified=True)
+            for nr, name in enumerate(('Anna', 'Beat', 'Carla'), start=1)
+        ]
+        db.session.add_all(riders)
+        db.session.flush()
+        for rider, time in zip(riders, (7.5, 4.25, 8.0)):
+            results.apply_time_changes({rider.id: {'time1': time}})
+        LiveState.set_active(riders[0].id)
+        db.session.commit()
+        return [rider.id for rider in riders]
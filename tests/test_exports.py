@@ -0,0 +1,14 @@
+def test_public_ranking_export_has_no_personal_fields(client, participants):
+    response = client.get('/export/ranking.csv')
+    assert response.status_code == 200
+    header, *rows = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+    assert header.split(';')[:4] == ['Rang', 'Start Nr.', 'Vorname', 'Name']
+    assert 'Ort' not in header.split(';')
+    assert not any('Bern' in row for row in rows)
+
+
+def test_participants_export_requires_login(client, login, participants):
+    assert client.get('/export/participants.csv').status_code == 302
+    login()
+    response = client.get('/export/participants.csv')
+    assert 'Ort' in response.get_data(as_text=True).splitlines()[0]
@@ -0,0 +1,47 @@
+import re
+
+from app import db
+from app.models import Competition, DataVersion
+
+USER_SELECT = re.compile(r'\bFROM user\b')
+
+
+def _user_selects(statements):
+    return [s for s in statements if USER_SELECT.search(s)]
+
+
+def test_identity_is_cached_between_requests(client, login, statements):
+    login()
+    client.get('/')
+    statements.clear()
+    assert client.get('/').status_code == 200
+    assert _user_selects(statements) == []
+
+
+def test_stamp_from_another_worker_invalidates(app, client, login, statements):
+    login()
+    client.get('/')
+    # What invalidate_user() in another process leaves behind: only the stamp moved
+    with app.app_context():
+        db.session.execute(db.update(DataVersion).values(users_version=DataVersion.users_version + 1))
+        db.session.commit()
+    statements.clear()
+    client.get('/')
+    assert len(_user_selects(statements)) == 1
+    statements.clear()
+    client.get('/')
+    assert _user_selects(statements) == []
+
+
+def test_password_change_bumps_stamp_in_every_competition(app, client, login):
+    with app.app_context():
+        Competition.create('Zweiter', 'zweiter')
+        db.session.commit()
+    login()
+    response = client.post('/password', data={
+        'current_password': 'secret', 'new_password': 'geheim123', 'new_password2': 'geheim123',
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        stamps = db.session.scalars(db.select(DataVersion.users_version)).all()
+    assert len(stamps) == 2 and len(set(stamps)) == 1 and stamps[0] > 1
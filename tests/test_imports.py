@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from app import db, imports
+from app.models import HIDDEN_PRELIM_FLAGS, Participant, SiteSettings
+
+CSV = (
+    'Start Nr.;Vorname;Name;Adresse;PLZ;Ort;Email\n'
+    '7;Anna;Test;Dorfstrasse 1;3000;Bern;anna@example.ch\n'
+)
+FLAGS = HIDDEN_PRELIM_FLAGS + ('final_qualified',)
+
+
+def _flags(participant):
+    return {name: getattr(participant, name) for name in FLAGS}
+
+
+def _hide_prelim_rounds(app):
+    with app.app_context():
+        SiteSettings.load().hide_prelim_rounds = True
+        db.session.commit()
+
+
+@pytest.mark.parametrize('hidden', [False, True])
+def test_import_sets_the_same_flags_as_the_form(app, client, login, hidden):
+    if hidden:
+        _hide_prelim_rounds(app)
+    login()
+    client.post('/participant_add', data={
+        'first_name': 'Beat', 'last_name': 'Test', 'address': 'Dorfstrasse 2',
+        'postal_code': '3000', 'city': 'Bern', 'email': 'beat@example.ch',
+    })
+    response = client.post('/participants/import', data={
+        'file': (io.BytesIO(CSV.encode()), 'anmeldungen.csv'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    with app.app_context():
+        imported = Participant.query.filter_by(first_name='Anna').one()
+        added = Participant.query.filter_by(first_name='Beat').one()
+        assert _flags(imported) == _flags(added)
+        assert imported.zwischenrunde_qualified is hidden
+        assert imported.final_qualified is False
+
+
+@pytest.mark.parametrize('tail, message', [
+    # Invalid UTF-8 far behind the header, past the first decoded chunk
+    (b'8;Beat;Test;Dorfstrasse 2;3000;Bern;beat@example.ch\n' * 500 + b'9;J\xfcrg;Test;Weg 3;3000;Bern;j@example.ch\n',
+     'UTF-8'),
+    (b'9;"' + b'x' * 200000 + b'";Test;Weg 3;3000;Bern;j@example.ch\n', 'Zeile'),
+], ids=['not-utf8', 'field-too-large'])
+def test_unreadable_rows_raise_import_file_error(app, tail, message):
+    with app.app_context():
+        with pytest.raises(imports.ImportFileError, match=message):
+            imports.import_participants(io.BytesIO(CSV.encode() + tail), dry_run=True)
+
+
+def test_unreadable_upload_is_flashed(app, client, login):
+    login()
+    response = client.post('/participants/import', data={
+        'file': (io.BytesIO(CSV.encode() + b'8;J\xfcrg;Test;Weg 3;3000;Bern;j@example.ch\n'), 'anmeldungen.csv'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert 'UTF-8' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Participant.query.count() == 0
@@ -0,0 +1,119 @@
+import io
+import os
+import time
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app import images
+from app.models import Participant
+
+
+def _png(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 900), color).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def _add(client, first_name, color='red'):
+    return client.post('/participant_add', data={
+        'first_name': first_name, 'last_name': 'Test', 'address': 'Dorfstrasse 1',
+        'postal_code': '3000', 'city': 'Bern', 'email': 'rider@example.ch',
+        'photo': (_png(color), 'foto.png'),
+    }, content_type='multipart/form-data')
+
+
+def _photo(app, first_name):
+    with app.app_context():
+        return Participant.query.filter_by(first_name=first_name).one().photo
+
+
+def _files(app, photo):
+    paths = [photo] + [images.variant_path(photo, variant) for variant in app.config['PHOTO_SIZES']]
+    return {path: os.path.exists(os.path.join(app.static_folder, path)) for path in paths}
+
+
+def _age(app, photo, seconds=3600):
+    past = time.time() - seconds
+    for path, exists in _files(app, photo).items():
+        if exists:
+            os.utime(os.path.join(app.static_folder, path), (past, past))
+
+
+def _last_jobs(client, *names):
+    jobs = client.get('/admin/jobs').get_json()['jobs']
+    return {name: next(job['status'] for job in jobs if job['name'] == name) for name in names}
+
+
+def test_upload_stores_original_and_variants(app, client, login):
+    login()
+    assert _add(client, 'Anna').status_code == 302
+    photo = _photo(app, 'Anna')
+    assert images.is_content_addressed(photo)
+    assert all(_files(app, photo).values())
+    with Image.open(os.path.join(app.static_folder, images.variant_path(photo, 'thumb'))) as thumb:
+        assert thumb.width == app.config['PHOTO_SIZES']['thumb']
+    assert _last_jobs(client, 'photo-variants') == {'photo-variants': 'done'}
+
+
+def test_shared_photo_is_removed_with_its_last_participant(app, client, login):
+    login()
+    _add(client, 'Anna')
+    _add(client, 'Beat')
+    photo = _photo(app, 'Anna')
+    assert _photo(app, 'Beat') == photo
+
+    _age(app, photo)
+    with app.app_context():
+        ids = [p.id for p in Participant.query.order_by(Participant.id)]
+    client.post(f'/participant_delete/{ids[0]}')
+    assert all(_files(app, photo).values())
+
+    client.post(f'/participant_delete/{ids[1]}')
+    assert not any(_files(app, photo).values())
+    assert _last_jobs(client, 'photo-remove', 'photo-cleanup') == {
+        'photo-remove': 'done', 'photo-cleanup': 'done',
+    }
+
+
+def test_cleanup_keeps_referenced_and_recent_files(app, client, login):
+    login()
+    _add(client, 'Anna')
+    photo = _photo(app, 'Anna')
+    upload_dir = app.config['UPLOAD_FOLDER']
+    old = os.path.join(upload_dir, 'verwaist.jpg')
+    recent = os.path.join(upload_dir, 'neu.jpg')
+    for path in (old, recent):
+        with open(path, 'wb') as handle:
+            handle.write(b'x')
+    past = time.time() - 3600
+    os.utime(old, (past, past))
+    _age(app, photo)
+
+    with app.app_context():
+        removed = images.cleanup_orphan_photos()
+    assert removed == ['uploads/verwaist.jpg']
+    assert os.path.exists(recent)
+    assert all(_files(app, photo).values())
+
+
+def test_reused_upload_is_not_released(app, client, login):
+    login()
+    _add(client, 'Anna')
+    photo = _photo(app, 'Anna')
+    _age(app, photo)
+    with app.app_context():
+        # Same content uploaded again, its participant not committed yet
+        assert images.store_upload(FileStorage(_png(), 'foto.png')) == photo
+        path = os.path.join(app.static_folder, photo)
+        assert time.time() - os.path.getmtime(path) < 5
+        Participant.query.filter_by(first_name='Anna').delete()
+        assert images.release_photo(photo) is False
+        # Stale variants may go, generate_variants recreates them after the commit
+        assert photo not in images.cleanup_orphan_photos()
+        assert os.path.exists(path)
+
+        _age(app, photo)
+        assert images.release_photo(photo) is True
+    assert not any(_files(app, photo).values())
@@ -0,0 +1,31 @@
+from app import db
+from app.models import Competition, Participant, Run, SiteSettings
+
+
+def test_finish_round_uses_runs_of_the_current_competition(app, client, login, participants):
+    with app.app_context():
+        settings = SiteSettings.load()
+        settings.prelim_threshold = 6.0
+        settings.prelim_min_qualified = 0
+        other = Competition.create('Zweiter', 'zweiter')
+        db.session.flush()
+        rider = Participant(competition_id=other.id, first_name='Dario', last_name='Test',
+                            address='Weg 3', postal_code='3000', city='Bern')
+        db.session.add(rider)
+        db.session.commit()
+        other_id, rider_id = other.id, rider.id
+
+    login()
+    with client.session_transaction() as session:
+        session['competition_id'] = other_id
+    assert client.post('/update_times_batch', json={'changes': [
+        {'id': rider_id, 'field': 'time1', 'value': 9.0},
+    ]}).status_code == 200
+    with client.session_transaction() as session:
+        session.pop('competition_id')
+
+    assert client.post('/finish_round/VR1').status_code == 302
+    with app.app_context():
+        assert db.session.get(Run, (rider_id, 'VR', 1)).competition_id == other_id
+        qualified = dict(db.session.execute(db.select(Participant.id, Participant.round1_qualified)).all())
+    assert qualified == {participants[0]: True, participants[1]: False, participants[2]: True, rider_id: False}
@@ -0,0 +1,40 @@
+"""Public and operator GETs must only read: no write lock, no WAL growth."""
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _writes(statements):
+    return [s for s in statements if s.lstrip().upper().startswith(WRITES)]
+
+
+PUBLIC = (
+    '/', '/index', '/ranking', '/active', '/active_id', '/events/active',
+    '/export/ranking.csv', '/c/default/ranking', '/c/default/active_id',
+)
+OPERATOR = ('/', '/stage', '/participants', '/export/participants.csv', '/admin/jobs')
+
+
+def test_public_gets_do_not_write(client, participants, statements):
+    for url in PUBLIC:
+        for _ in range(2):
+            response = client.get(url)
+            assert response.status_code == 200, url
+            response.get_data()
+    assert statements, 'listener saw no queries'
+    assert _writes(statements) == []
+
+
+def test_operator_gets_do_not_write(client, login, participants, statements):
+    login()
+    statements.clear()
+    for url in OPERATOR:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        response.get_data()
+    assert _writes(statements) == []
+
+
+def test_listener_sees_writes(client, login, participants, statements):
+    login()
+    statements.clear()
+    client.post(f'/set_active/{participants[1]}')
+    assert _writes(statements)
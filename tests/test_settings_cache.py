@@ -0,0 +1,28 @@
+from flask import g
+
+from app import db
+from app.models import DataVersion, SiteSettings
+
+
+def test_settings_snapshot_follows_the_settings_stamp(app):
+    with app.app_context():
+        assert SiteSettings.get_settings().prelim_threshold == 99.0
+        # Another worker saves the settings: only the row and the stamp change
+        db.session.execute(db.update(SiteSettings).values(prelim_threshold=42.0, intermediate_top_n=3))
+        db.session.execute(db.update(DataVersion).values(settings_version=DataVersion.settings_version + 1))
+        db.session.commit()
+        g.pop('_data_version_stamps', None)
+        settings = SiteSettings.get_settings()
+        assert (settings.prelim_threshold, settings.intermediate_top_n) == (42.0, 3)
+
+
+def test_admin_settings_save_is_visible_immediately(app, client, login):
+    login()
+    client.get('/')
+    response = client.post('/admin/settings', data={
+        'prelim_threshold': '50', 'prelim_min_qualified': '2', 'intermediate_top_n': '4',
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        settings = SiteSettings.get_settings()
+        assert (settings.prelim_threshold, settings.prelim_min_qualified, settings.intermediate_top_n) == (50.0, 2, 4)
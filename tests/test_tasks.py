@@ -0,0 +1,63 @@
+import threading
+
+from flask import Flask, current_app
+
+from app.tasks import TaskQueue
+
+
+def _queue(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    return TaskQueue(app)
+
+
+def test_eager_jobs_run_in_the_caller_with_app_context():
+    queue = _queue(TESTING=True)
+    seen = []
+    job_id = queue.submit('collect', lambda value: seen.append((value, current_app.name)), 1)
+    assert seen == [(1, __name__)]
+    job = queue.status(job_id)
+    assert job['name'] == 'collect' and job['status'] == 'done'
+
+
+def test_failed_job_is_recorded():
+    queue = _queue(TESTING=True)
+
+    def boom():
+        raise RuntimeError('kaputt')
+
+    job_id = queue.submit('boom', boom)
+    assert queue.status(job_id)['status'] == 'failed'
+    assert queue.status(job_id)['error'] == 'kaputt'
+
+
+def test_history_is_bounded_and_newest_first():
+    queue = _queue(TESTING=True, TASK_HISTORY=3)
+    ids = [queue.submit('noop', lambda: None) for _ in range(5)]
+    assert [job['id'] for job in queue.jobs()] == ids[:1:-1]
+    assert queue.status(ids[0]) is None
+
+
+def test_background_jobs_finish_on_shutdown():
+    queue = _queue(TASKS_EAGER=False)
+    done = []
+    ids = [queue.submit('append', done.append, n) for n in range(4)]
+    queue.shutdown()
+    assert sorted(done) == [0, 1, 2, 3]
+    assert {queue.status(job_id)['status'] for job_id in ids} == {'done'}
+
+
+def test_full_queue_runs_inline():
+    queue = _queue(TASKS_EAGER=False, TASK_WORKERS=1, TASK_QUEUE_SIZE=1)
+    release = threading.Event()
+    blocked = queue.submit('block', release.wait, 5)
+    caller = []
+    inline = queue.submit('inline', lambda: caller.append(threading.current_thread()))
+    try:
+        # No slot left: the job ran in this thread before submit() returned
+        assert caller == [threading.current_thread()]
+        assert queue.status(inline)['status'] == 'done'
+    finally:
+        release.set()
+        queue.shutdown()
+    assert queue.status(blocked)['status'] == 'done'
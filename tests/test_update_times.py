@@ -0,0 +1,140 @@
+import pytest
+
+from app import db, results
+from app.models import Run
+
+
+def _times(app, participant_id):
+    with app.app_context():
+        return Run.times_for([participant_id]).get(participant_id, {})
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-1', 'abc'])
+def test_update_times_rejects_invalid_values(app, client, login, participants, value):
+    login()
+    pid = participants[0]
+    response = client.post(f'/update_times/{pid}', data={'update_times': '1', 'time1': value, 'time2': '3.5'})
+    assert response.status_code == 302
+    # Nothing of the submission is applied, the old time is kept
+    assert _times(app, pid) == {'time1': 7.5}
+    with client.session_transaction() as session:
+        assert session['_flashes'][-1][0] == 'danger'
+
+
+def test_update_times_accepts_decimal_comma(app, client, login, participants):
+    login()
+    pid = participants[0]
+    client.post(f'/update_times/{pid}', data={'update_times': '1', 'time1': '6,25', 'time4': '5'})
+    assert _times(app, pid) == {'time1': 6.25, 'time4': 5.0}
+
+
+def test_update_times_batch(app, client, login, participants):
+    login()
+    pid = participants[1]
+    response = client.post('/update_times_batch', json={'changes': [
+        {'id': pid, 'field': 'time2', 'value': '3.75'},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['changed'] == [pid]
+    assert data['participants'][0]['toptime_Vorrunde'] == 4.25
+    assert _times(app, pid) == {'time1': 4.25, 'time2': 3.75}
+
+
+def test_update_times_batch_conflicting_insert_is_409(app, client, login, participants, monkeypatch):
+    login()
+    pid = participants[0]
+    # As if the run was inserted by another request after the runs were read
+    monkeypatch.setattr(Run, 'times_for', classmethod(lambda cls, ids: {}))
+    response = client.post('/update_times_batch', json={'changes': [
+        {'id': pid, 'field': 'time1', 'value': 9},
+    ]})
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data['error']
+    assert data['participants'][0]['id'] == pid
+    monkeypatch.undo()
+    assert _times(app, pid) == {'time1': 7.5}
+
+
+def test_update_time_inserts_and_detects_existing_cell(app, client, login, participants):
+    login()
+    pid = participants[0]
+    response = client.post(f'/update_time/{pid}', json={'field': 'time2', 'value': '5.5', 'expected': ''})
+    assert response.status_code == 200 and response.get_json()['changed'] is True
+    with app.app_context():
+        # Lost race: the cell was recorded in the meantime
+        assert results._write_time(pid, 'VR', 2, None, 6.0) is False
+    assert _times(app, pid) == {'time1': 7.5, 'time2': 5.5}
+
+
+def test_insert_after_reads_is_not_committed_early(app, participants):
+    pid = participants[0]
+    with app.app_context():
+        db.session.execute(db.select(Run.time)).all()
+        assert results._write_time(pid, 'VR', 3, None, 6.0) is True
+        db.session.rollback()
+    assert 'time3' not in _times(app, pid)
+
+
+def _stale_read(monkeypatch, times):
+    # As if another judge changed the cells after they were read
+    monkeypatch.setattr(Run, 'times_for', classmethod(lambda cls, ids: times))
+
+
+@pytest.mark.parametrize('value', [9.0, None], ids=['update', 'clear'])
+def test_update_times_batch_stale_cell_is_409(app, client, login, participants, monkeypatch, value):
+    login()
+    pid = participants[0]
+    _stale_read(monkeypatch, {pid: {'time1': 1.0}})
+    response = client.post('/update_times_batch', json={'changes': [
+        {'id': participants[1], 'field': 'time2', 'value': 2.0},
+        {'id': pid, 'field': 'time1', 'value': value},
+    ]})
+    assert response.status_code == 409
+    monkeypatch.undo()
+    # Nothing of the request was kept
+    assert _times(app, pid) == {'time1': 7.5}
+    assert _times(app, participants[1]) == {'time1': 4.25}
+
+
+def test_update_times_batch_updates_many_cells(app, client, login, participants):
+    login()
+    response = client.post('/update_times_batch', json={'changes': [
+        {'id': pid, 'field': 'time1', 'value': value}
+        for pid, value in zip(participants, (1.0, None, 3.0))
+    ]})
+    assert response.status_code == 200
+    assert [_times(app, pid) for pid in participants] == [{'time1': 1.0}, {}, {'time1': 3.0}]
+
+
+def _last_flash(client):
+    with client.session_transaction() as session:
+        return session['_flashes'][-1]
+
+
+def test_update_times_stale_cell_is_flashed(app, client, login, participants, monkeypatch):
+    login()
+    pid = participants[0]
+    _stale_read(monkeypatch, {pid: {'time1': 1.0}})
+    response = client.post(f'/update_times/{pid}', data={'update_times': '1', 'time1': '9', 'time2': '3'})
+    assert response.status_code == 302
+    assert _last_flash(client) == ('danger', 'Die Zeit wurde inzwischen von jemand anderem geändert.')
+    monkeypatch.undo()
+    assert _times(app, pid) == {'time1': 7.5}
+
+
+def test_update_times_bulk_stale_cell_is_flashed(app, client, login, participants, monkeypatch):
+    login()
+    pid = participants[0]
+    # Cleared by someone else in the meantime: the update finds no row
+    _stale_read(monkeypatch, {pid: {'time1': 7.5}})
+    with app.app_context():
+        results.apply_time_changes({pid: {'time1': None}})
+        db.session.commit()
+    response = client.post('/update_times_bulk', data={f'time1_{pid}': '9', f'time2_{participants[1]}': '3'})
+    assert response.status_code == 302
+    assert _last_flash(client)[0] == 'danger'
+    monkeypatch.undo()
+    assert _times(app, pid) == {}
+    assert _times(app, participants[1]) == {'time1': 4.25}